@@ -0,0 +1,37 @@
+import sys
+import argparse
+
+from src.benchmark.suite import SCENARIOS, default_tolerance, run_suite, compare, format_results, load_results, save_results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the turn pipeline with deterministic stub models (no GPU or network needed).")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS),
+                        help="Scenario to run (repeatable). Defaults to all of them.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--llm-latency-ms", type=float, default=20.0, help="Simulated cost of one LLM batch.")
+    parser.add_argument("--token-latency-ms", type=float, default=0.5, help="Simulated cost per generated token.")
+    parser.add_argument("--model-latency-ms", type=float, default=2.0, help="Simulated cost of one emotion/embedding call.")
+    parser.add_argument("--output", help="Write the results as JSON.")
+    parser.add_argument("--baseline", help="Results JSON to compare against; exits with status 1 on a regression.")
+    parser.add_argument("--tolerance", type=float, default=default_tolerance)
+    args = parser.parse_args()
+
+    latencies = {
+        "llm_batch_latency": args.llm_latency_ms / 1000,
+        "llm_token_latency": args.token_latency_ms / 1000,
+        "model_latency": args.model_latency_ms / 1000,
+    }
+    results = run_suite(args.scenario or list(SCENARIOS), latencies, args.seed)
+    baseline = load_results(args.baseline) if args.baseline else None
+
+    print(format_results(results, baseline))
+    if args.output:
+        save_results(results, args.output)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"[ERROR] Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline.")
@@ -0,0 +1,16 @@
+import os
+import argparse
+import numpy as np
+
+from src.data.columnar import convert_run
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert saved records or a turn log into a columnar run (Parquet + .npy embeddings).")
+    parser.add_argument("--records", default=os.path.join(os.path.dirname(__file__), "src", "data", "saved"),
+                        help="Saved record file or folder to read (searched recursively).")
+    parser.add_argument("--output", required=True, help="Directory for turns.parquet and embeddings.npy.")
+    parser.add_argument("--float16", action="store_true", help="Store embeddings as float16 (half the size).")
+    args = parser.parse_args()
+
+    count = convert_run(args.records, args.output, np.float16 if args.float16 else np.float32)
+    print(f"Wrote {count} turns to {args.output}")
@@ -0,0 +1,34 @@
+import os
+import argparse
+
+from src.data.catalog import RunCatalog, REWARD_COLUMNS
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index saved runs in a SQLite catalog and query their turns.")
+    parser.add_argument("--root", default=os.path.join(os.path.dirname(__file__), "src", "data", "saved"),
+                        help="Folder with one subfolder per run.")
+    parser.add_argument("--db", help="Catalog file (default: <root>/catalog.sqlite).")
+    parser.add_argument("--no-ingest", action="store_true", help="Query the catalog as is, without indexing new data.")
+    parser.add_argument("--persona")
+    parser.add_argument("--run")
+    parser.add_argument("--epoch", type=int)
+    parser.add_argument("--turn", type=int)
+    parser.add_argument("--policy-version")
+    parser.add_argument("--reward", nargs=3, action="append", metavar=("COLUMN", "LOW", "HIGH"),
+                        help=f"LOW <= COLUMN < HIGH; use '-' for an open bound. Columns: {', '.join(REWARD_COLUMNS)}")
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    catalog = RunCatalog(args.root, args.db)
+    if not args.no_ingest:
+        catalog.ingest()
+
+    reward_ranges = {}
+    for column, low, high in args.reward or []:
+        reward_ranges[column] = (None if low == "-" else float(low), None if high == "-" else float(high))
+
+    for turn in catalog.query(persona=args.persona, run=args.run, epoch=args.epoch, turn=args.turn,
+                              policy_version=args.policy_version, limit=args.limit, **reward_ranges):
+        rewards = " ".join(f"{getattr(turn, column)}" for column in REWARD_COLUMNS)
+        print(f"{turn.run} | epoch {turn.epoch} | {turn.persona_name} | turn {turn.turn_index} | rewards {rewards} | {turn.policy_version}")
+    catalog.close()
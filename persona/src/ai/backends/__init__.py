@@ -0,0 +1,16 @@
+import importlib
+
+# Backend name -> (module, class). Modules are imported lazily so a CPU box never needs
+# bitsandbytes/accelerate and a GPU box never needs llama_cpp.
+BACKENDS = {
+    "hf": (".hf", "HFBackend"),
+    "llama_cpp": (".llama_cpp", "LlamaCppBackend"),
+    "stub": (".stub", "StubBackend"),
+}
+
+def get_backend(name):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend '{name}'. Available backends: {', '.join(BACKENDS)}")
+    module_name, class_name = BACKENDS[name]
+    module = importlib.import_module(module_name, __name__)
+    return getattr(module, class_name)
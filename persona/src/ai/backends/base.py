@@ -0,0 +1,37 @@
+class GenerationRequest:
+    def __init__(self, prompt, max_new_tokens, temperature, prefix=None):
+        self.prompt = prompt
+        self.max_new_tokens = max_new_tokens
+        self.temperature = temperature
+        self.prefix = prefix
+        # Filled in by the backend, for tracing.
+        self.prompt_tokens = None
+        self.generated_tokens = None
+
+class ScoreRequest:
+    def __init__(self, prompt, candidates, prefix=None):
+        self.prompt = prompt
+        self.candidates = candidates
+        self.prefix = prefix
+        self.prompt_tokens = None
+
+class LLMBackend:
+    """
+    Interface between the LLM front end (request batching) and a concrete model runtime.
+    """
+    def __init__(self, model_name, prefix_cache_budget_bytes):
+        self.model_name = model_name
+        self.prefix_cache_budget_bytes = prefix_cache_budget_bytes
+
+    def generate_batch(self, requests):
+        """
+        Generates one completion per GenerationRequest and returns the decoded strings in the same order.
+        """
+        raise NotImplementedError
+
+    def score_batch(self, requests):
+        """
+        Runs one forward pass per ScoreRequest and returns, in the same order, the next-token
+        probability of each of the request's candidate strings.
+        """
+        raise NotImplementedError
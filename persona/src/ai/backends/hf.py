@@ -0,0 +1,277 @@
+import os
+import copy
+import torch
+from transformers import (
+    AutoTokenizer,
+    AutoModelForCausalLM,
+    BitsAndBytesConfig,
+    LogitsProcessor,
+    LogitsProcessorList,
+    StoppingCriteria,
+    StoppingCriteriaList,
+)
+from accelerate import Accelerator
+from .base import LLMBackend
+from ..prefix_cache import PrefixCache
+
+# Prefixes shorter than this are cheaper to prefill than to copy out of the cache.
+min_prefix_tokens = 16
+
+# Characters of prompt tail re-tokenized together with each scoring candidate (see _candidate_tokens).
+candidate_context_chars = 64
+
+class PerRowTemperature(LogitsProcessor):
+    """
+    Scales the logits of every row in the batch by that row's own sampling temperature.
+    """
+    def __init__(self, temperatures):
+        self.temperatures = temperatures
+
+    def __call__(self, input_ids, scores):
+        return scores / self.temperatures.unsqueeze(1)
+
+class PerRowMaxNewTokens(StoppingCriteria):
+    """
+    Marks a row as finished once it has produced its own max_new_tokens,
+    so short requests stop early while the rest of the batch keeps decoding.
+    """
+    def __init__(self, prompt_length, limits):
+        self.prompt_length = prompt_length
+        self.limits = limits
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return (input_ids.shape[1] - self.prompt_length) >= self.limits
+
+class HFBackend(LLMBackend):
+    def __init__(self, model_name, prefix_cache_budget_bytes):
+        super().__init__(model_name, prefix_cache_budget_bytes)
+        secret_key = os.getenv('hf_key')
+
+        if torch.cuda.is_available():
+            self.device = "cuda"
+            print("CUDA is available. Loading model on GPU...")
+        else:
+            self.device = "cpu"
+            print("Warning: CUDA is not available. Running on CPU.")
+
+        # Load the tokenizer.
+        self.tokenizer = AutoTokenizer.from_pretrained(
+            model_name,
+            token=secret_key  # ensure you authenticate if needed
+        )
+        # Batched prompts are left-padded so every row ends right where generation starts.
+        self.tokenizer.padding_side = "left"
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+
+        if self.device == "cuda":
+            # Set up bitsandbytes quantization configuration for 4-bit (Q4) mode.
+            quantization_config = BitsAndBytesConfig(
+                load_in_4bit=True,
+                bnb_4bit_use_double_quant=True,
+                bnb_4bit_quant_type='nf4',  # or 'fp4' depending on your needs
+                bnb_4bit_compute_dtype=torch.float16
+            )
+
+            # Load the model with quantization.
+            self.model = AutoModelForCausalLM.from_pretrained(
+                model_name,
+                device_map="auto",
+                quantization_config=quantization_config,
+                token=secret_key
+            )
+        else:
+            # bitsandbytes 4-bit kernels are CUDA only; use the llama_cpp backend for quantized CPU inference.
+            self.model = AutoModelForCausalLM.from_pretrained(
+                model_name,
+                torch_dtype=torch.bfloat16,
+                token=secret_key
+            )
+
+        # Use torch.compile to optimize the model (PyTorch 2.0+).
+        if hasattr(torch, "compile"):
+            print("Compiling model with torch.compile for speed improvements...")
+            self.model = torch.compile(self.model)
+
+        # Set up the accelerator and prepare the model.
+        self.accelerator = Accelerator()
+        self.model = self.accelerator.prepare(self.model)
+
+        self.prefix_cache = PrefixCache(prefix_cache_budget_bytes)
+
+    def generate_batch(self, requests):
+        with torch.inference_mode():
+            return self._run_grouped(requests, self._generate_group)
+
+    def score_batch(self, requests):
+        with torch.inference_mode():
+            return self._run_grouped(requests, self._score_group)
+
+    def _run_grouped(self, requests, run_group):
+        device = next(self.model.parameters()).device
+
+        # Group requests by the cached prefix they can reuse; each group is one model call.
+        groups = {}
+        for index, request in enumerate(requests):
+            token_ids = self.tokenizer(request.prompt)["input_ids"]
+            request.prompt_tokens = len(token_ids)
+            prefix_ids = self._resolve_prefix(request, token_ids)
+            key = tuple(prefix_ids) if prefix_ids else None
+            groups.setdefault(key, []).append((index, token_ids))
+
+        results = [None] * len(requests)
+        for key, members in groups.items():
+            group_requests = [requests[index] for index, _ in members]
+            if key is None:
+                group_results = run_group(group_requests, [ids for _, ids in members], device)
+            else:
+                past_key_values = self._prefill(list(key), device)
+                suffixes = [ids[len(key):] for _, ids in members]
+                group_results = run_group(group_requests, suffixes, device, list(key), past_key_values)
+            for (index, _), result in zip(members, group_results):
+                results[index] = result
+        return results
+
+    def _resolve_prefix(self, request, token_ids):
+        """
+        Returns the token-ID prefix of the prompt to serve from the cache, or None.
+        An explicit prefix hint wins; otherwise the longest already cached prefix is used.
+        """
+        if request.prefix:
+            hint_ids = self.tokenizer(request.prefix)["input_ids"]
+            length = 0
+            for a, b in zip(hint_ids, token_ids):
+                if a != b:
+                    break
+                length += 1
+        else:
+            length, _ = self.prefix_cache.lookup(token_ids)
+
+        # At least one prompt token must be left to produce the first next-token logits.
+        length = min(length, len(token_ids) - 1)
+        if length < min_prefix_tokens:
+            return None
+        return token_ids[:length]
+
+    def _prefill(self, prefix_ids, device):
+        """
+        Returns past_key_values for prefix_ids, only running the model over the part
+        that is not already covered by a shorter cached prefix.
+        """
+        past_key_values = self.prefix_cache.get(prefix_ids)
+        if past_key_values is not None:
+            return past_key_values
+
+        cached_length, cached = self.prefix_cache.lookup(prefix_ids)
+        cached = copy.deepcopy(cached) if cached is not None else None
+        new_ids = torch.tensor([prefix_ids[cached_length:]], device=device)
+        outputs = self.model(input_ids=new_ids, past_key_values=cached, use_cache=True)
+        self.prefix_cache.put(prefix_ids, outputs.past_key_values)
+        return outputs.past_key_values
+
+    def _build_inputs(self, token_ids, device, prefix_ids):
+        # Left-pad the (suffix) token IDs; with a cached prefix the padding sits between prefix and suffix
+        # and is masked out, so positions of the real tokens stay contiguous.
+        width = max(len(ids) for ids in token_ids)
+        pad_id = self.tokenizer.pad_token_id
+        input_ids = []
+        attention_mask = []
+        for ids in token_ids:
+            padding = width - len(ids)
+            input_ids.append(prefix_ids + [pad_id] * padding + ids)
+            attention_mask.append([1] * len(prefix_ids) + [0] * padding + [1] * len(ids))
+        return torch.tensor(input_ids, device=device), torch.tensor(attention_mask, device=device)
+
+    def _expand_cache(self, past_key_values, batch_size):
+        # The model appends to the cache, so hand it a private copy with one row per request.
+        past_key_values = copy.deepcopy(past_key_values)
+        if batch_size > 1:
+            past_key_values.batch_repeat_interleave(batch_size)
+        return past_key_values
+
+    def _generate_group(self, requests, token_ids, device, prefix_ids=None, past_key_values=None):
+        prefix_ids = prefix_ids or []
+        pad_id = self.tokenizer.pad_token_id
+        input_ids, attention_mask = self._build_inputs(token_ids, device, prefix_ids)
+        if past_key_values is not None:
+            past_key_values = self._expand_cache(past_key_values, len(requests))
+
+        prompt_length = input_ids.shape[1]
+        limits = torch.tensor([request.max_new_tokens for request in requests], device=device)
+        temperatures = torch.tensor([request.temperature for request in requests], dtype=torch.float32, device=device)
+
+        outputs = self.model.generate(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            past_key_values=past_key_values,
+            max_new_tokens=max(request.max_new_tokens for request in requests),
+            use_cache=True,
+            do_sample=True,
+            temperature=1.0,
+            pad_token_id=pad_id,
+            logits_processor=LogitsProcessorList([PerRowTemperature(temperatures)]),
+            stopping_criteria=StoppingCriteriaList([PerRowMaxNewTokens(prompt_length, limits)])
+        )
+
+        responses = []
+        for row, request in zip(outputs, requests):
+            new_tokens = row[prompt_length:prompt_length + request.max_new_tokens]
+            request.generated_tokens = int((new_tokens != pad_id).sum())
+            responses.append(self.tokenizer.decode(new_tokens, skip_special_tokens=True))
+        return responses
+
+    def _score_group(self, requests, token_ids, device, prefix_ids=None, past_key_values=None):
+        """
+        Runs a single forward pass and returns, per request, the next-token probability of each candidate.
+        """
+        prefix_ids = prefix_ids or []
+        token_ids = list(token_ids)
+        candidate_ids = []
+        for i, request in enumerate(requests):
+            shared, ids = self._candidate_tokens(request.prompt, request.candidates)
+            token_ids[i] = token_ids[i] + shared
+            candidate_ids.append(ids)
+        input_ids, attention_mask = self._build_inputs(token_ids, device, prefix_ids)
+        position_ids = (attention_mask.cumsum(-1) - 1).masked_fill(attention_mask == 0, 1)
+        if past_key_values is not None:
+            past_key_values = self._expand_cache(past_key_values, len(requests))
+
+        # Only the uncached part is fed; the mask still spans the cached prefix.
+        outputs = self.model(
+            input_ids=input_ids[:, len(prefix_ids):],
+            attention_mask=attention_mask,
+            position_ids=position_ids[:, len(prefix_ids):],
+            past_key_values=past_key_values,
+            use_cache=past_key_values is not None
+        )
+        probabilities = torch.softmax(outputs.logits[:, -1, :].float(), dim=-1)
+
+        results = []
+        for row, ids in zip(probabilities, candidate_ids):
+            results.append(row[torch.tensor(ids, device=row.device)].tolist())
+        return results
+
+    def _candidate_tokens(self, prompt, candidates):
+        """
+        Returns (shared, ids): the tokens every candidate starts with after the prompt (e.g. a lone space
+        piece before a digit), which are appended to the prompt, and the token that tells each candidate apart.
+        Candidates are tokenized in context, so a leading space splits or merges as in the model's own output.
+        """
+        tail = prompt[-candidate_context_chars:]
+        tail_ids = self.tokenizer(tail, add_special_tokens=False)["input_ids"]
+        continuations = []
+        for candidate in candidates:
+            ids = self.tokenizer(tail + candidate, add_special_tokens=False)["input_ids"]
+            if ids[:len(tail_ids)] != tail_ids or len(ids) == len(tail_ids):
+                # The candidate would merge into the prompt's last token; fall back to its own last token.
+                return [], [self._candidate_token_id(c) for c in candidates]
+            continuations.append(ids[len(tail_ids):])
+        shared = []
+        while (all(len(c) > len(shared) + 1 for c in continuations) and
+               len({c[len(shared)] for c in continuations}) == 1):
+            shared.append(continuations[0][len(shared)])
+        return shared, [c[len(shared)] for c in continuations]
+
+    def _candidate_token_id(self, candidate):
+        # SentencePiece tokenizers prepend a word-boundary token, so the candidate itself is the last ID.
+        return self.tokenizer(candidate, add_special_tokens=False)["input_ids"][-1]
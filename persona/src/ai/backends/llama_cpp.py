@@ -0,0 +1,58 @@
+import os
+import math
+from llama_cpp import Llama, LlamaRAMCache
+from .base import LLMBackend
+
+# Context window of the GGUF model; persona prompts are 1-2k tokens.
+n_ctx = 4096
+
+class LlamaCppBackend(LLMBackend):
+    """
+    CPU backend running a quantized GGUF model (e.g. Q4_K_M) through llama.cpp.
+    model_name is the path to the .gguf file.
+    """
+    def __init__(self, model_name, prefix_cache_budget_bytes):
+        super().__init__(model_name, prefix_cache_budget_bytes)
+        self.device = "cpu"
+        print(f"Loading GGUF model from {model_name} with llama.cpp...")
+        self.model = Llama(
+            model_path=model_name,
+            n_ctx=n_ctx,
+            n_threads=int(os.getenv("llm_threads", os.cpu_count() or 1)),
+            verbose=False
+        )
+        # llama.cpp keeps KV state for the longest matching prompt prefix in this cache.
+        self.model.set_cache(LlamaRAMCache(capacity_bytes=prefix_cache_budget_bytes))
+
+    def generate_batch(self, requests):
+        # llama.cpp decodes a single sequence at a time; the batch still shares the prompt-prefix cache.
+        responses = []
+        for request in requests:
+            completion = self.model.create_completion(
+                request.prompt,
+                max_tokens=request.max_new_tokens,
+                temperature=request.temperature,
+                top_k=50
+            )
+            request.prompt_tokens = completion["usage"]["prompt_tokens"]
+            request.generated_tokens = completion["usage"]["completion_tokens"]
+            responses.append(completion["choices"][0]["text"])
+        return responses
+
+    def score_batch(self, requests):
+        results = []
+        for request in requests:
+            completion = self.model.create_completion(
+                request.prompt,
+                max_tokens=1,
+                temperature=0.0,
+                logprobs=max(len(request.candidates), 20)
+            )
+            request.prompt_tokens = completion["usage"]["prompt_tokens"]
+            top_logprobs = completion["choices"][0]["logprobs"]["top_logprobs"][0]
+            probabilities = {}
+            for token, logprob in top_logprobs.items():
+                token = token.strip()
+                probabilities[token] = probabilities.get(token, 0.0) + math.exp(logprob)
+            results.append([probabilities.get(candidate.strip(), 0.0) for candidate in request.candidates])
+        return results
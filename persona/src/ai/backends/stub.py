@@ -0,0 +1,49 @@
+import time
+import hashlib
+from .base import LLMBackend
+
+# Simulated cost of one backend call and of each generated token (seconds).
+batch_latency = 0.0
+token_latency = 0.0
+
+WORDS = ("the", "road", "north", "is", "watched", "I", "trust", "no", "one", "here", "but", "you",
+         "coin", "first", "then", "we", "talk", "about", "the", "job", "tonight")
+
+class StubBackend(LLMBackend):
+    """
+    Deterministic CPU stand-in for a model: the output depends only on the prompt, so benchmark runs
+    are repeatable and exercise the orchestration code without downloading or running a model.
+    """
+    def __init__(self, model_name, prefix_cache_budget_bytes):
+        super().__init__(model_name, prefix_cache_budget_bytes)
+        self.device = "cpu"
+
+    def generate_batch(self, requests):
+        generated = 0
+        responses = []
+        for request in requests:
+            seed = self._seed(request.prompt)
+            length = min(request.max_new_tokens, 8 + seed % 24)
+            words = [WORDS[(seed >> (i % 24)) % len(WORDS)] for i in range(length)]
+            # Roughly four characters per token.
+            request.prompt_tokens = len(request.prompt) // 4
+            request.generated_tokens = length
+            generated = max(generated, length)
+            responses.append(" ".join(words) + ".")
+        # Rows of a batch decode in lockstep, so the batch costs its longest row.
+        time.sleep(batch_latency + generated * token_latency)
+        return responses
+
+    def score_batch(self, requests):
+        results = []
+        for request in requests:
+            seed = self._seed(request.prompt)
+            weights = [1 + (seed >> i) % 7 for i in range(len(request.candidates))]
+            total = sum(weights)
+            request.prompt_tokens = len(request.prompt) // 4
+            results.append([weight / total for weight in weights])
+        time.sleep(batch_latency)
+        return results
+
+    def _seed(self, text):
+        return int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:8], "little")
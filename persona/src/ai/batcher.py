@@ -0,0 +1,64 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+class MicroBatcher:
+    def __init__(self, run_batch, batch_window=0.01, max_batch_size=8, name="MicroBatcher"):
+        """
+        run_batch: Callable that receives a list of submitted items and returns one result per item (same order).
+        batch_window: Seconds to keep gathering requests after the first one arrives.
+        max_batch_size: Upper bound on the number of items handed to run_batch at once.
+        name: Name of the worker thread (useful when debugging).
+        """
+        self.run_batch = run_batch
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._loop, name=name, daemon=True)
+        self._worker.start()
+
+    def submit(self, item) -> Future:
+        """
+        Queues an item for the next batch and returns a Future resolved with its result.
+        """
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def _gather(self):
+        # Block for the first request, then keep collecting until the window closes or the batch is full.
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._gather()
+            items = [item for item, _ in batch]
+            try:
+                results = self.run_batch(items)
+            except Exception as e:
+                print(f"[ERROR] {self._worker.name}: Batch of {len(items)} failed: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            if len(results) != len(batch):
+                # A short result list would leave its callers blocked forever on their futures.
+                e = RuntimeError(f"run_batch returned {len(results)} results for {len(batch)} items.")
+                print(f"[ERROR] {self._worker.name}: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
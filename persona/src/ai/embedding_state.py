@@ -0,0 +1,57 @@
+import numpy as np
+
+class EmbeddingState:
+    def __init__(self, encode, decay=0.8, background_weight=0.2, history_weight=0.3, recent_weight=0.5):
+        """
+        encode: Callable mapping one text to its sentence embedding (ideally cached per text).
+        decay: How much of the running history aggregate survives each new message.
+        *_weight: Mix of background, decayed history and recent messages in the final state embedding.
+        Each message is embedded exactly once, so the per-turn cost does not grow with the conversation.
+        """
+        self.encode = encode
+        self.decay = decay
+        self.background_weight = background_weight
+        self.history_weight = history_weight
+        self.recent_weight = recent_weight
+        self.background = None
+        self.background_text = None
+        self.reset()
+
+    def reset(self):
+        """
+        Forgets the conversation (but keeps the background embedding).
+        """
+        self.history = None
+        self.seen = 0
+
+    def set_background(self, text):
+        if text != self.background_text:
+            self.background = np.asarray(self.encode(text), dtype=np.float32)
+            self.background_text = text
+
+    def update(self, history, recent_messages):
+        """
+        Folds every message of history not seen yet into the decayed aggregate and returns
+        the combined state embedding for the given recent messages.
+        """
+        if len(history) < self.seen:
+            # A new conversation started on this state.
+            self.reset()
+        for event in history[self.seen:]:
+            embedding = np.asarray(self.encode(event['message']), dtype=np.float32)
+            if self.history is None:
+                self.history = embedding
+            else:
+                self.history = self.decay * self.history + (1 - self.decay) * embedding
+        self.seen = len(history)
+
+        recent = np.mean([np.asarray(self.encode(text), dtype=np.float32) for text in recent_messages], axis=0)
+        combined = self.recent_weight * recent
+        if self.background is not None:
+            combined = combined + self.background_weight * self.background
+        if self.history is not None:
+            combined = combined + self.history_weight * self.history
+        norm = np.linalg.norm(combined)
+        if norm > 0:
+            combined = combined / norm
+        return combined.astype(np.float32)
@@ -0,0 +1,124 @@
+import queue
+from .rl import RL
+
+class ActorLink:
+    """
+    Actor-side end of the actor/learner channel. RL instances with an ActorLink stop learning locally:
+    they ship their rewarded transitions to the learner and pick up the weights it broadcasts.
+    """
+    def __init__(self, worker_id, transition_queue, weight_queue):
+        self.worker_id = worker_id
+        self.transition_queue = transition_queue
+        self.weight_queue = weight_queue
+        self.rls = {}
+
+    def attach(self, rl):
+        """
+        Routes rl's transitions to the learner and blocks until the learner's current weights for its
+        persona have been loaded, so the first action is never taken with this process's own random init.
+        """
+        if self.rls.get(rl.persona_name) is rl:
+            return
+        self.rls[rl.persona_name] = rl
+        rl.actor_link = self
+        self.transition_queue.put(("attach", self.worker_id, rl.persona_name, None, None))
+        while True:
+            persona_name, updates, state_dict = self.weight_queue.get()
+            if persona_name == rl.persona_name:
+                rl.load_weights(state_dict, updates)
+                return
+            self._apply(persona_name, updates, state_dict)
+
+    def send(self, rl, batch, episode_end):
+        """
+        Ships one segment of rewarded transitions (tensors moved to CPU) for rl's persona.
+        """
+        segment = {key: value.cpu() for key, value in batch.items()}
+        self.transition_queue.put(("segment", self.worker_id, rl.persona_name, segment, episode_end))
+
+    def sync(self):
+        """
+        Applies the newest broadcast weights for every attached persona without blocking.
+        """
+        latest = {}
+        while True:
+            try:
+                persona_name, updates, state_dict = self.weight_queue.get_nowait()
+            except queue.Empty:
+                break
+            latest[persona_name] = (updates, state_dict)
+        for persona_name, (updates, state_dict) in latest.items():
+            self._apply(persona_name, updates, state_dict)
+
+    def _apply(self, persona_name, updates, state_dict):
+        rl = self.rls.get(persona_name)
+        if rl is not None and updates > rl.updates:
+            rl.load_weights(state_dict, updates)
+
+    def close(self):
+        self.transition_queue.put(("done", self.worker_id, None, None, None))
+
+class Learner:
+    """
+    Owns one RL (policy, optimizer, rollout buffer and checkpoint) per persona, trains on the
+    transitions shipped by the actors, and broadcasts new weights after every PPO update.
+    The learner's weights are the only ones acted with: an actor attaching a persona is sent them first.
+    """
+    def __init__(self, transition_queue, weight_queues):
+        self.transition_queue = transition_queue
+        self.weight_queues = weight_queues
+        self.rls = {}
+        # (worker_id, persona_name) -> segments of the episode being played; episodes are ingested whole
+        # so transitions from different actors never interleave inside one GAE trajectory.
+        self.staging = {}
+        # Workers that have not sent "done"; finished workers never read their weight queue again.
+        self.active = set(range(len(weight_queues)))
+
+    def run(self):
+        while self.active:
+            kind, worker_id, persona_name, segment, episode_end = self.transition_queue.get()
+            if kind == "done":
+                self.active.discard(worker_id)
+                print(f"[DEBUG] Learner: Worker {worker_id} finished ({len(self.active)} still running).")
+                continue
+            if kind == "attach":
+                self.weight_queues[worker_id].put(self._weights(self._rl(persona_name)))
+                continue
+
+            key = (worker_id, persona_name)
+            self.staging.setdefault(key, []).append(segment)
+            if episode_end:
+                self._ingest(persona_name, self.staging.pop(key))
+
+        for rl in self.rls.values():
+            rl.save_policy(force=True)
+        print("[DEBUG] Learner: All workers finished, policies saved.")
+
+    def _rl(self, persona_name):
+        if persona_name not in self.rls:
+            self.rls[persona_name] = RL(persona_name)
+        return self.rls[persona_name]
+
+    def _ingest(self, persona_name, segments):
+        rl = self._rl(persona_name)
+        updates = rl.updates
+        for i, segment in enumerate(segments):
+            rl.ingest(segment, episode_end=i == len(segments) - 1)
+        if rl.updates != updates:
+            self._broadcast(rl)
+
+    def _weights(self, rl):
+        with rl.lock:
+            return rl.persona_name, rl.updates, {key: value.detach().to("cpu", copy=True) for key, value in rl.policy_net.state_dict().items()}
+
+    def _broadcast(self, rl):
+        weights = self._weights(rl)
+        for worker_id in self.active:
+            self.weight_queues[worker_id].put(weights)
+
+def run_learner(transition_queue, weight_queues):
+    Learner(transition_queue, weight_queues).run()
+    # Weights still buffered for workers that exited before reading them are not worth waiting for:
+    # their feeder threads would block on full pipes and keep this process from exiting.
+    for weight_queue in weight_queues:
+        weight_queue.cancel_join_thread()
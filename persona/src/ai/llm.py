@@ -1,11 +1,22 @@
 import os
-import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM, BitsAndBytesConfig
 from dotenv import load_dotenv
-from accelerate import Accelerator
+from .batcher import MicroBatcher
+from .backends import get_backend
+from .backends.base import GenerationRequest, ScoreRequest
+from ..data.tracer import Tracer
 
 load_dotenv()
-secret_key = os.getenv('hf_key')
+
+# Backend selection; override with llm_backend / llm_model in the .env file.
+default_backend = "hf"
+default_model_name = "mistralai/Mistral-7B-Instruct-v0.3"
+
+# Concurrent generate_response calls arriving within this window are merged into one batch.
+batch_window = 0.01
+max_batch_size = 8
+
+# Memory budget for cached past_key_values of shared prompt prefixes (LRU across all personas).
+prefix_cache_budget_mb = 2048
 
 class LLM:
     _instance = None
@@ -15,65 +26,67 @@ class LLM:
             cls._instance = super(LLM, cls).__new__(cls)
         return cls._instance
 
-    def __init__(self, model_name="mistralai/Mistral-7B-Instruct-v0.3"):
+    def __init__(self, model_name=None, backend=None):
         if getattr(self, "_initialized", False):
             return
         self._initialized = True
 
-        if torch.cuda.is_available():
-            self.device = "cuda"
-            print("CUDA is available. Loading model on GPU...")
-        else:
-            self.device = "cpu"
-            print("Warning: CUDA is not available. Running on CPU.")
+        backend = backend or os.getenv("llm_backend", default_backend)
+        model_name = model_name or os.getenv("llm_model", default_model_name)
+        print(f"[DEBUG] LLM: Using '{backend}' backend with {model_name}")
+        self.backend = get_backend(backend)(model_name, prefix_cache_budget_mb * 1024 * 1024)
+        self.device = self.backend.device
+        self.tracer = Tracer.instance()
 
-        # Load the tokenizer.
-        self.tokenizer = AutoTokenizer.from_pretrained(
-            model_name,
-            token=secret_key  # ensure you authenticate if needed
+        self.batcher = MicroBatcher(
+            self._run_batch,
+            batch_window=batch_window,
+            max_batch_size=max_batch_size,
+            name="LLMBatcher"
         )
-        
-        # Set up bitsandbytes quantization configuration for 4-bit (Q4) mode.
-        quantization_config = BitsAndBytesConfig(
-            load_in_4bit=True,
-            bnb_4bit_use_double_quant=True,
-            bnb_4bit_quant_type='nf4',  # or 'fp4' depending on your needs
-            bnb_4bit_compute_dtype=torch.float16
-        )
-        
-        # Load the model with quantization.
-        self.model = AutoModelForCausalLM.from_pretrained(
-            model_name,
-            device_map="auto",
-            quantization_config=quantization_config,
-            token=secret_key
-        )
-        
-        # Use torch.compile to optimize the model (PyTorch 2.0+).
-        if hasattr(torch, "compile"):
-            print("Compiling model with torch.compile for speed improvements...")
-            self.model = torch.compile(self.model)
-        
-        # Set up the accelerator and prepare the model.
-        self.accelerator = Accelerator()
-        self.model = self.accelerator.prepare(self.model)
-                
-    def generate_response(self, prompt: str, max_new_tokens: int = 256, temperature: float = 1.0) -> str:
-        with torch.inference_mode():
-            inputs = self.tokenizer(prompt, return_tensors="pt")
-            # Move inputs to the correct device.
-            device = next(self.model.parameters()).device
-            inputs = {k: v.to(device) for k, v in inputs.items()}
 
-            prompt_length = inputs["input_ids"].shape[1]
+    def generate_response(self, prompt: str, max_new_tokens: int = 256, temperature: float = 1.0, prefix: str = None) -> str:
+        """
+        Queues the prompt with any other concurrent requests and blocks until its completion is decoded.
+        prefix: Optional leading part of the prompt that is shared with other calls (e.g. the persona background).
+                Its past_key_values are cached so later prompts only prefill the remaining suffix.
+        """
+        request = GenerationRequest(prompt, max_new_tokens, temperature, prefix)
+        response = self.batcher.submit(request).result()
+        # Token counts go to the caller's open span (e.g. persona.response).
+        self.tracer.annotate(prompt_tokens=request.prompt_tokens, generated_tokens=request.generated_tokens)
+        return response
+
+    def score_candidates(self, prompt: str, candidates, prefix: str = None):
+        """
+        Returns the next-token probability of each candidate string after the prompt,
+        from a single forward pass instead of an autoregressive decode.
+        """
+        request = ScoreRequest(prompt, list(candidates), prefix)
+        probabilities = self.batcher.submit(request).result()
+        self.tracer.annotate(prompt_tokens=request.prompt_tokens)
+        return probabilities
 
-            outputs = self.model.generate(
-                **inputs,
-                max_new_tokens=max_new_tokens,
-                use_cache=True,
-                do_sample=True,
-                temperature=temperature
-            )
+    def score_candidates_many(self, prompts, candidates, prefix: str = None):
+        """
+        Scores several prompts that share a prefix; they are queued together so they land in one batch.
+        """
+        requests = [ScoreRequest(prompt, list(candidates), prefix) for prompt in prompts]
+        futures = [self.batcher.submit(request) for request in requests]
+        results = [future.result() for future in futures]
+        self.tracer.annotate(prompt_tokens=sum(request.prompt_tokens or 0 for request in requests))
+        return results
 
-            new_tokens = outputs[0][prompt_length:]
-            return self.tokenizer.decode(new_tokens, skip_special_tokens=True)
+    def _run_batch(self, requests):
+        # A window can mix generation and scoring requests; each kind goes to its own backend call.
+        results = [None] * len(requests)
+        for kind, run in ((GenerationRequest, self.backend.generate_batch), (ScoreRequest, self.backend.score_batch)):
+            indices = [i for i, request in enumerate(requests) if isinstance(request, kind)]
+            if not indices:
+                continue
+            with self.tracer.span(f"llm.{run.__name__}", batch_size=len(indices)) as span:
+                for i, result in zip(indices, run([requests[i] for i in indices])):
+                    results[i] = result
+                span.set(prompt_tokens=sum(requests[i].prompt_tokens or 0 for i in indices),
+                         generated_tokens=sum(getattr(requests[i], "generated_tokens", None) or 0 for i in indices))
+        return results
@@ -0,0 +1,92 @@
+from collections.abc import Mapping
+import numpy as np
+import torch
+
+# Field order of the policy's state and action vectors. Sorted, which is the order RL has always used.
+MENTAL_STATE_FIELDS = ("anxiety", "arousal", "confidence", "dominance", "guilt", "valence")
+# Labels of j-hartmann/emotion-english-distilroberta-base, sorted.
+EMOTION_FIELDS = ("anger", "disgust", "fear", "joy", "neutral", "sadness", "surprise")
+
+class FixedVector(Mapping):
+    """
+    Read-mostly mapping with a fixed schema, stored as one float32 array.
+    Behaves like a dict of floats for prompts and analysis, and converts to a tensor without copying.
+    """
+    __slots__ = ("values",)
+    fields = ()
+    index = {}
+
+    def __init__(self, values=None):
+        if values is None:
+            self.values = np.zeros(len(self.fields), dtype=np.float32)
+        else:
+            self.values = np.array(values, dtype=np.float32).reshape(len(self.fields))
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Builds the vector from a dict, validating that it has exactly the schema's fields.
+        """
+        if isinstance(data, cls):
+            return data.copy()
+        keys = {key.lower() for key in data}
+        if keys != set(cls.fields):
+            missing = sorted(set(cls.fields) - keys)
+            unknown = sorted(keys - set(cls.fields))
+            raise ValueError(f"{cls.__name__} expects fields {list(cls.fields)} (missing: {missing}, unknown: {unknown})")
+        lowered = {key.lower(): value for key, value in data.items()}
+        return cls([lowered[field] for field in cls.fields])
+
+    def __getitem__(self, key):
+        return float(self.values[self.index[key]])
+
+    def __setitem__(self, key, value):
+        self.values[self.index[key]] = value
+
+    def __iter__(self):
+        return iter(self.fields)
+
+    def __len__(self):
+        return len(self.fields)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+    def __getstate__(self):
+        return self.values
+
+    def __setstate__(self, state):
+        self.values = state
+
+    def copy(self):
+        return type(self)(self.values)
+
+    def to_dict(self):
+        return {field: float(value) for field, value in zip(self.fields, self.values)}
+
+    def as_tensor(self, device=None):
+        """
+        Shares memory with the vector on CPU; only a device transfer copies.
+        """
+        tensor = torch.from_numpy(self.values)
+        return tensor if device is None else tensor.to(device)
+
+class MentalState(FixedVector):
+    __slots__ = ()
+    fields = MENTAL_STATE_FIELDS
+    index = {field: i for i, field in enumerate(MENTAL_STATE_FIELDS)}
+
+    def clipped(self):
+        return MentalState(np.clip(self.values, 0, 100))
+
+class EmotionVector(FixedVector):
+    __slots__ = ()
+    fields = EMOTION_FIELDS
+    index = {field: i for i, field in enumerate(EMOTION_FIELDS)}
+
+    @classmethod
+    def mean(cls, vectors):
+        return cls(np.mean([vector.values for vector in vectors], axis=0))
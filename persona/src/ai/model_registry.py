@@ -0,0 +1,90 @@
+import threading
+import torch
+from transformers import pipeline
+from sentence_transformers import SentenceTransformer
+
+EMOTION_MODEL = "j-hartmann/emotion-english-distilroberta-base"
+SENTENCE_MODEL = "sentence-transformers/all-mpnet-base-v2"
+
+class SharedModel:
+    """
+    Thread-safe handle to a model shared by every persona in the process.
+    Calls are serialised with a lock because HF pipelines are not re-entrant.
+    """
+    def __init__(self, model):
+        self.model = model
+        self.lock = threading.Lock()
+
+    def __call__(self, *args, **kwargs):
+        with self.lock:
+            return self.model(*args, **kwargs)
+
+    def encode(self, *args, **kwargs):
+        with self.lock:
+            return self.model.encode(*args, **kwargs)
+
+class ModelRegistry:
+    _instance = None
+
+    def __init__(self):
+        self.models = {}
+        self.loaders = {
+            "emotion_classifier": self._load_emotion_classifier,
+            "sentence_transformer": self._load_sentence_transformer,
+        }
+        self.lock = threading.Lock()
+
+    @classmethod
+    def instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def get(self, name):
+        """
+        Returns the shared handle for the named model, loading it on first use.
+        """
+        with self.lock:
+            if name not in self.models:
+                print(f"[DEBUG] ModelRegistry: Loading {name}...")
+                self.models[name] = SharedModel(self.loaders[name]())
+            return self.models[name]
+
+    def emotion_classifier(self):
+        return self.get("emotion_classifier")
+
+    def sentence_transformer(self):
+        return self.get("sentence_transformer")
+
+    def warmup(self):
+        """
+        Loads every auxiliary model up front and runs one dummy input through each,
+        so the first game turn does not pay for loading or lazy initialisation.
+        """
+        self.emotion_classifier()("Hello.")
+        self.sentence_transformer().encode("Hello.")
+
+    def release(self, name=None):
+        """
+        Drops the named model (or all models) so its memory can be reclaimed.
+        """
+        with self.lock:
+            names = [name] if name else list(self.models)
+            for model_name in names:
+                self.models.pop(model_name, None)
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def _load_emotion_classifier(self):
+        return pipeline(
+            "text-classification",
+            model=EMOTION_MODEL,
+            tokenizer=EMOTION_MODEL,
+            top_k=None
+        )
+
+    def _load_sentence_transformer(self):
+        sentence_transformer = SentenceTransformer(SENTENCE_MODEL)
+        if torch.cuda.is_available():
+            sentence_transformer.to("cuda")
+        return sentence_transformer
@@ -0,0 +1,177 @@
+import os
+import json
+import time
+import numpy as np
+import torch
+import torch.nn as nn
+from torch.distributions import Normal
+from . import rl as rl_module
+from .mental_state import MentalState, EmotionVector
+from .rollout_buffer import RunningMeanStd, compute_gae
+from ..data.record_sink import SEGMENT_PATTERN, iter_logged_turns
+
+def iter_record_files(root):
+    """
+    Yields every saved record JSON and turn-log segment (.jsonl) under root (or root itself if it is a file).
+    """
+    if os.path.isfile(root):
+        yield root
+        return
+    for directory, _, files in sorted(os.walk(root)):
+        for file_name in sorted(files):
+            if file_name.endswith((".json", ".jsonl")):
+                yield os.path.join(directory, file_name)
+
+def iter_recorded_turns(root, persona_name=None):
+    """
+    Streams (persona_name, turn_dict, is_last_turn_of_record) from saved Record.to_dict() dumps,
+    one file at a time, then from RecordSink segments.
+    """
+    segment_paths = []
+    for path in iter_record_files(root):
+        if path.endswith(".jsonl"):
+            # Records can span segments, so the segments are read together below. Other .jsonl files
+            # (e.g. a headless run's games.jsonl) hold no turns.
+            if SEGMENT_PATTERN.match(os.path.basename(path)):
+                segment_paths.append(path)
+            continue
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[WARNING] Offline: Skipping {path}: {e}")
+            continue
+        if not isinstance(data, dict) or "records" not in data:
+            continue
+        name = data.get("persona_name")
+        if persona_name is not None and name != persona_name:
+            continue
+        records = data["records"]
+        for i, turn in enumerate(records):
+            yield name, turn, i == len(records) - 1
+    yield from iter_logged_turns(segment_paths, persona_name)
+
+def turn_to_transition(turn):
+    """
+    Rebuilds (state, action, reward) of a recorded turn exactly as RL.select_action and RL.update_policy saw it.
+    Returns None when the sampled action cannot be recovered from the record: dumps written before
+    prev_mental_state was copied store the post-update state twice, and a state clipped to the 0-100
+    range hides how far past the bound the action went.
+    """
+    prev_mental_state = MentalState.from_dict(turn["prev_mental_state"])
+    mental_change = MentalState.from_dict(turn["mental_change"])
+    if np.array_equal(prev_mental_state.values, mental_change.values):
+        return None
+    if np.any((mental_change.values <= 0) | (mental_change.values >= 100)):
+        return None
+    state = np.concatenate([
+        prev_mental_state.values,
+        np.asarray(turn["input_message_embedding"], dtype=np.float32),
+        EmotionVector.from_dict(turn["input_message_emotion"]).values
+    ])
+    action = mental_change.values - prev_mental_state.values
+    reward = (
+        rl_module.mental_change_weight * turn["reward_mental_change"] +
+        rl_module.notes_weight * turn["notes_reward"] +
+        rl_module.response_weight * turn["response_reward"] +
+        rl_module.response_emotion_weight * turn["response_emotion_reward"]
+    )
+    return state, action, reward
+
+class OfflineTrainer:
+    def __init__(self, rl, epochs=10, minibatch_size=256, chunk_size=65536, beta=1.0, max_weight=20.0):
+        """
+        rl: RL instance whose policy (and checkpoint) is trained.
+        epochs: Passes over each chunk of recorded transitions.
+        chunk_size: Transitions held in memory at once while streaming.
+        beta: Advantage temperature of the advantage-weighted regression (AWR) actor loss.
+        max_weight: Clip on the exponentiated advantage weights.
+        """
+        self.rl = rl
+        self.epochs = epochs
+        self.minibatch_size = minibatch_size
+        self.chunk_size = chunk_size
+        self.beta = beta
+        self.max_weight = max_weight
+        self.reward_stats = RunningMeanStd()
+
+    def train(self, turns):
+        """
+        turns: Iterable of (turn_dict, is_last_turn_of_record). Returns the number of transitions trained on.
+        """
+        states, actions, rewards, dones = [], [], [], []
+        total = 0
+        unrecoverable = 0
+        start = time.monotonic()
+        for turn, done in turns:
+            try:
+                transition = turn_to_transition(turn)
+            except (KeyError, TypeError, ValueError) as e:
+                print(f"[WARNING] Offline: Skipping malformed turn: {e}")
+                continue
+            if transition is None:
+                unrecoverable += 1
+                # The episode still ends here, so the next turn does not inherit its returns.
+                if done and dones:
+                    dones[-1] = 1.0
+                continue
+            state, action, reward = transition
+            states.append(state)
+            actions.append(action)
+            rewards.append(reward)
+            dones.append(float(done))
+            if len(states) >= self.chunk_size:
+                total += self._train_chunk(states, actions, rewards, dones)
+                states, actions, rewards, dones = [], [], [], []
+        if states:
+            total += self._train_chunk(states, actions, rewards, dones)
+
+        elapsed = time.monotonic() - start
+        if unrecoverable:
+            print(f"[WARNING] Offline: Skipped {unrecoverable} turns of {self.rl.persona_name} whose action cannot be "
+                  f"recovered (legacy records with prev_mental_state == mental_change, or clipped mental states).")
+        if total:
+            print(f"[INFO] Offline: Trained {self.rl.persona_name} on {total} transitions "
+                  f"x {self.epochs} epochs in {elapsed:.1f}s ({total * self.epochs / max(elapsed, 1e-9):.0f} transitions/s)")
+            self.rl.snapshot_policy()
+            self.rl.save_policy(force=True)
+        return total
+
+    def _train_chunk(self, states, actions, rewards, dones):
+        device = self.rl.device
+        dones[-1] = 1.0  # Episodes never continue across chunks.
+        states = torch.from_numpy(np.stack(states)).to(device)
+        actions = torch.from_numpy(np.stack(actions)).to(device)
+        rewards = torch.tensor(rewards, dtype=torch.float32, device=device)
+        dones = torch.tensor(dones, dtype=torch.float32, device=device)
+
+        # Discounted reward-to-go per episode (GAE with zero values and lambda = 1).
+        self.reward_stats.update(rewards)
+        rewards = self.reward_stats.normalize(rewards)
+        returns, _ = compute_gae(rewards, torch.zeros_like(rewards), dones, torch.zeros((), device=device), self.rl.gamma, 1.0)
+
+        policy_net = self.rl.policy_net
+        n = states.shape[0]
+        with self.rl.lock:
+            for _ in range(self.epochs):
+                permutation = torch.randperm(n, device=device)
+                for begin in range(0, n, self.minibatch_size):
+                    index = permutation[begin:begin + self.minibatch_size]
+                    action_means, stds, values = policy_net(states[index])
+                    values = values.squeeze(-1)
+
+                    # Advantage-weighted regression: imitate recorded actions in proportion to how much better they did.
+                    advantages = returns[index] - values.detach()
+                    weights = torch.clamp(torch.exp(advantages / self.beta), max=self.max_weight)
+                    log_probs = Normal(action_means, stds).log_prob(actions[index]).sum(dim=-1)
+                    actor_loss = -(weights * log_probs).mean()
+                    critic_loss = nn.MSELoss()(values, returns[index])
+
+                    loss = actor_loss + critic_loss
+                    self.rl.optimizer.zero_grad()
+                    loss.backward()
+                    nn.utils.clip_grad_norm_(policy_net.parameters(), self.rl.max_grad_norm)
+                    self.rl.optimizer.step()
+                self.rl.updates += 1
+                self.rl.updates_since_save += 1
+        return n
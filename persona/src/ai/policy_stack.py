@@ -0,0 +1,80 @@
+import copy
+import torch
+from torch.func import functional_call, stack_module_state, vmap
+from .batcher import MicroBatcher
+
+# select_action calls from different personas (or games) arriving within this window share one forward pass.
+batch_window = 0.002
+max_batch_size = 64
+
+class PolicyExecutor:
+    """
+    Evaluates the actor/critic of many personas in a single vectorized forward pass.
+    Each persona keeps its own Policy and optimizer; their weights are stacked with
+    torch.func.stack_module_state and re-stacked only when one of them has been updated.
+    """
+    _instance = None
+
+    def __init__(self):
+        self.stacked_key = None
+        self.stacked = None
+        self.batcher = MicroBatcher(self._run_batch, batch_window=batch_window, max_batch_size=max_batch_size, name="PolicyExecutor")
+
+    @classmethod
+    def instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def forward(self, rl, state):
+        """
+        Returns (action_mean, std, value, policy_hash) of rl's policy for state ([1, input_dim]);
+        policy_hash is the snapshot ID of the exact weights that were evaluated.
+        """
+        return self.batcher.submit((rl, state)).result()
+
+    def _run_batch(self, requests):
+        # One row per distinct RL; a persona that appears twice reuses its row.
+        rls = []
+        for rl, _ in requests:
+            if rl not in rls:
+                rls.append(rl)
+        params, buffers, base, hashes = self._stack(rls)
+
+        # States are grouped per policy: [num_policies, max_requests_per_policy, input_dim].
+        rows = [[state for other, state in requests if other is rl] for rl in rls]
+        width = max(len(row) for row in rows)
+        states = torch.stack([
+            torch.cat(row + [row[-1]] * (width - len(row)), dim=0) for row in rows
+        ])
+
+        def call(p, b, x):
+            return functional_call(base, (p, b), (x,))
+
+        with torch.no_grad():
+            action_means, stds, values = vmap(call)(params, buffers, states)
+
+        results = []
+        seen = {id(rl): 0 for rl in rls}
+        for rl, _ in requests:
+            i = rls.index(rl)
+            j = seen[id(rl)]
+            seen[id(rl)] += 1
+            results.append((action_means[i, j:j + 1], stds[i, j:j + 1], values[i, j:j + 1], hashes[i]))
+        return results
+
+    def _stack(self, rls):
+        key = tuple((id(rl), rl.updates) for rl in rls)
+        if key != self.stacked_key:
+            models = []
+            hashes = []
+            for rl in rls:
+                with rl.lock:
+                    models.append(copy.deepcopy(rl.policy_net))
+                    hashes.append(rl.policy_hash)
+            params, buffers = stack_module_state(models)
+            # The base module only provides the structure for functional_call.
+            base = copy.deepcopy(models[0]).to("meta")
+            self.stacked = (params, buffers, base, hashes)
+            self.stacked_key = key
+        return self.stacked
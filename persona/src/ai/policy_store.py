@@ -0,0 +1,106 @@
+import os
+import io
+import hashlib
+import tempfile
+import threading
+import numpy as np
+import torch
+
+# Store a snapshot as a bitwise XOR against its persona's previous snapshot (lossless, and small
+# after a PPO update because most high-order bits do not change).
+delta_compression = True
+
+# Longest chain of deltas before a full snapshot is written again (bounds load time).
+max_delta_chain = 16
+
+class PolicySnapshotStore:
+    """
+    Content-addressed store of policy weights. A snapshot's ID is the SHA-256 of its weights, so
+    identical weights are stored once no matter how many turns or personas reference them.
+    Files live in <root>/<id[:2]>/<id>.npz.
+    """
+    def __init__(self, root):
+        self.root = root
+        self.lock = threading.Lock()
+        self.known = set()
+        self.chain_lengths = {}   # snapshot ID -> number of deltas between it and a full snapshot
+
+    def put(self, state_dict, base=None, snapshot_id=None):
+        """
+        Stores the weights (if not stored yet) and returns their snapshot ID.
+        base: ID of an earlier snapshot to store a delta against (ignored if delta compression is off).
+        snapshot_id: The weights' ID if the caller already hashed them.
+        """
+        arrays = {key: value.detach().cpu().numpy() for key, value in state_dict.items()}
+        if snapshot_id is None:
+            snapshot_id = self.hash(arrays)
+        with self.lock:
+            if snapshot_id in self.known:
+                return snapshot_id
+        path = self.path(snapshot_id)
+        if not os.path.exists(path):
+            chain = self.chain_lengths.get(base, max_delta_chain) + 1 if base else max_delta_chain + 1
+            if delta_compression and chain <= max_delta_chain and self._compatible(base, arrays):
+                base_arrays = self._load_arrays(base)
+                payload = {key: arrays[key].view(np.uint32) ^ base_arrays[key].view(np.uint32) for key in arrays}
+                self._write(path, payload, base=base)
+            else:
+                chain = 0
+                self._write(path, arrays)
+            with self.lock:
+                self.chain_lengths[snapshot_id] = chain
+        with self.lock:
+            self.known.add(snapshot_id)
+        return snapshot_id
+
+    def get(self, snapshot_id):
+        """
+        Returns the stored weights as a state dict of CPU tensors.
+        """
+        return {key: torch.from_numpy(value) for key, value in self._load_arrays(snapshot_id).items()}
+
+    def path(self, snapshot_id):
+        return os.path.join(self.root, snapshot_id[:2], f"{snapshot_id}.npz")
+
+    def hash(self, arrays):
+        digest = hashlib.sha256()
+        for key in sorted(arrays):
+            value = np.ascontiguousarray(arrays[key], dtype=np.float32)
+            digest.update(key.encode("utf-8"))
+            digest.update(str(value.shape).encode("utf-8"))
+            digest.update(value.tobytes())
+        return digest.hexdigest()
+
+    def _compatible(self, base, arrays):
+        if base is None or not os.path.exists(self.path(base)):
+            return False
+        with np.load(self.path(base)) as data:
+            return all(key in data.files and data[key].shape == value.shape and value.dtype == np.float32
+                       for key, value in arrays.items())
+
+    def _load_arrays(self, snapshot_id):
+        with np.load(self.path(snapshot_id)) as data:
+            arrays = {key: data[key] for key in data.files if key != "__base__"}
+            base = str(data["__base__"]) if "__base__" in data.files else None
+        if base is None:
+            return arrays
+        base_arrays = self._load_arrays(base)
+        return {key: (value ^ base_arrays[key].view(np.uint32)).view(np.float32) for key, value in arrays.items()}
+
+    def _write(self, path, arrays, base=None):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        buffer = io.BytesIO()
+        if base is not None:
+            np.savez_compressed(buffer, __base__=np.array(base), **arrays)
+        else:
+            np.savez_compressed(buffer, **arrays)
+        # Several processes may write the same snapshot; the rename makes that harmless.
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(buffer.getvalue())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
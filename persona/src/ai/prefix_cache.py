@@ -0,0 +1,68 @@
+from collections import OrderedDict
+
+class PrefixCache:
+    def __init__(self, budget_bytes):
+        """
+        budget_bytes: Upper bound on the memory held by cached past_key_values.
+        Entries are keyed on token-ID prefixes and evicted least-recently-used first.
+        """
+        self.budget_bytes = budget_bytes
+        self.used_bytes = 0
+        self.entries = OrderedDict()  # tuple(token_ids) -> (past_key_values, size_in_bytes)
+        self.lengths = {}             # prefix length -> number of entries with that length
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, token_ids):
+        """
+        Returns (prefix_length, past_key_values) for the longest cached prefix of token_ids,
+        or (0, None) if nothing matches.
+        """
+        for length in sorted(self.lengths, reverse=True):
+            if length > len(token_ids):
+                continue
+            key = tuple(token_ids[:length])
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return length, self.entries[key][0]
+        self.misses += 1
+        return 0, None
+
+    def get(self, token_ids):
+        key = tuple(token_ids)
+        if key not in self.entries:
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return self.entries[key][0]
+
+    def put(self, token_ids, past_key_values):
+        key = tuple(token_ids)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return
+        size = self._cache_size(past_key_values)
+        if size > self.budget_bytes:
+            return
+        self.entries[key] = (past_key_values, size)
+        self.lengths[len(key)] = self.lengths.get(len(key), 0) + 1
+        self.used_bytes += size
+        while self.used_bytes > self.budget_bytes:
+            self._evict_oldest()
+
+    def clear(self):
+        self.entries.clear()
+        self.lengths.clear()
+        self.used_bytes = 0
+
+    def _evict_oldest(self):
+        key, (_, size) = self.entries.popitem(last=False)
+        self.used_bytes -= size
+        self.lengths[len(key)] -= 1
+        if self.lengths[len(key)] == 0:
+            del self.lengths[len(key)]
+
+    def _cache_size(self, past_key_values):
+        tensors = list(past_key_values.key_cache) + list(past_key_values.value_cache)
+        return sum(t.numel() * t.element_size() for t in tensors)
@@ -1,6 +1,15 @@
 from .policy import Policy
+from .rollout_buffer import RolloutBuffer, RunningMeanStd, compute_gae
+from .policy_stack import PolicyExecutor
+from .policy_store import PolicySnapshotStore
+from .mental_state import MentalState, EmotionVector
+from ..data.tracer import Tracer
 import os
 import json
+import numpy as np
+import time
+import tempfile
+import threading
 import torch
 import torch.nn as nn
 import torch.optim as optim
@@ -11,8 +20,20 @@ notes_weight = 0.8
 response_weight = 1.0
 response_emotion_weight = 1.5
 
+# Checkpoint cadence: the policy is written after this many updates or seconds, whichever comes first
+# (and always at the end of a game, see Persona.flush_rewards).
+save_every_updates = 10
+save_every_seconds = 60.0
+
+# Evaluate the policies of concurrently acting personas in one stacked forward pass (see PolicyExecutor).
+batched_policy_inference = False
+
+# Folder holding the policy checkpoints (<persona>.pt).
+trained_dir = os.path.join(os.path.dirname(__file__), "trained")
+
 class RL():
-    def __init__(self, persona_name, input_dim=768 + 6 + 7, action_dim=6, hidden_dim=128, lr=3e-4, gamma=0.99, clip_epsilon=0.2):
+    def __init__(self, persona_name, input_dim=768 + 6 + 7, action_dim=6, hidden_dim=128, lr=3e-4, gamma=0.99, clip_epsilon=0.2,
+                 gae_lambda=0.95, rollout_size=32, ppo_epochs=4, minibatch_size=8, max_grad_norm=0.5):
         """
         persona_name: Name of the persona (used to identify the policy file).
         input_dim: Dimension of the full state vector.
@@ -21,204 +42,315 @@ class RL():
         lr: Learning rate.
         gamma: Discount factor.
         clip_epsilon: PPO clipping parameter.
+        gae_lambda: GAE smoothing parameter.
+        rollout_size: Number of rewarded transitions (across turns and games) collected per PPO update.
+        ppo_epochs: Passes over the rollout per update.
+        minibatch_size: Transitions per gradient step.
+        max_grad_norm: Gradient clipping threshold.
         """
         self.persona_name = persona_name
         self.gamma = gamma
         self.clip_epsilon = clip_epsilon
+        self.gae_lambda = gae_lambda
+        self.ppo_epochs = ppo_epochs
+        self.minibatch_size = minibatch_size
+        self.max_grad_norm = max_grad_norm
 
-        # Initialize the policy network (actor and critic) and move it to GPU.
-        self.policy_net = Policy(input_dim, action_dim, hidden_dim).to("cuda")
+        # Initialize the policy network (actor and critic) and move it to GPU if there is one.
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.policy_net = Policy(input_dim, action_dim, hidden_dim).to(self.device)
         self.optimizer = optim.Adam(self.policy_net.parameters(), lr=lr)
         
-        # Buffers for storing trajectories.
-        self.states = []
-        self.actions = []
-        self.log_probs = []
-        self.rewards = []
-        self.values = []
-
-        # Policy file path; stored in the 'trained' directory as persona_name.json.
+        # Guards the policy and buffers: actions are selected on the game thread while
+        # rewards arrive from the persona's reward worker.
+        self.lock = threading.RLock()
+
+        # Preallocated rollout storage and running reward statistics.
+        self.buffer = RolloutBuffer(rollout_size, input_dim, action_dim, self.device)
+        self.reward_stats = RunningMeanStd()
+
+        # Set by ActorLink.attach when this RL runs inside an actor process of the actor/learner split.
+        self.actor_link = None
+
+        self.tracer = Tracer.instance()
+
+        # Checkpoint bookkeeping for the save cadence.
+        self.updates = 0
+        self.updates_since_save = 0
+        self.last_save_time = time.monotonic()
+
+        # Policy file path; stored in the 'trained' directory as persona_name.pt.
+        # persona_name.json is the legacy JSON state dict, migrated on first load.
         formatted_name = self.persona_name.lower().replace(" ", "_")
-        self.policy_file = os.path.join(os.path.dirname(__file__), "trained", f"{formatted_name}.json")
+        self.policy_file = os.path.join(trained_dir, f"{formatted_name}.pt")
+        self.legacy_policy_file = os.path.join(trained_dir, f"{formatted_name}.json")
+
+        # Content-addressed weight snapshots; turns reference the snapshot that acted, by ID.
+        self.snapshots = PolicySnapshotStore(os.path.join(trained_dir, "snapshots"))
+        self.policy_hash = None     # snapshot ID of the current weights
+        self.acting_policy = None   # snapshot ID of the weights behind the last select_action
+        self.pending_snapshots = [] # (snapshot ID, base ID, CPU state dict) staged under the lock, written after it
         self.load_policy()  # Load existing policy if available, otherwise create new.
 
     def load_policy(self):
         """
-        Checks if a policy file exists for the given persona.
-        If it exists, loads the state dictionary (converting from lists to tensors).
+        Loads the binary checkpoint (policy, optimizer state and update count) for the persona.
+        A legacy JSON state dict is converted once into a binary checkpoint.
         Otherwise, saves the initial policy.
         """
+        device = next(self.policy_net.parameters()).device
         if os.path.exists(self.policy_file):
             print(f"Loading policy from {self.policy_file}")
-            with open(self.policy_file, "r") as f:
+            checkpoint = torch.load(self.policy_file, map_location=device)
+            self.policy_net.load_state_dict(checkpoint["policy"])
+            self.optimizer.load_state_dict(checkpoint["optimizer"])
+            self.updates = checkpoint.get("updates", 0)
+        elif os.path.exists(self.legacy_policy_file):
+            print(f"Migrating JSON policy {self.legacy_policy_file} to {self.policy_file}")
+            with open(self.legacy_policy_file, "r") as f:
                 state_dict_json = json.load(f)
             # Convert JSON lists back into tensors.
             state_dict = {}
             for key, value in state_dict_json.items():
                 state_dict[key] = torch.tensor(value)
             self.policy_net.load_state_dict(state_dict)
+            self.save_policy(force=True)
         else:
             print(f"No policy file found for {self.persona_name}. Creating new policy.")
-            self.save_policy()
+            self.save_policy(force=True)
+        self.snapshot_policy()
 
-    def save_policy(self):
+    def snapshot_policy(self):
         """
-        Saves the current policy network’s state dictionary to a JSON file.
-        Tensors are converted to lists for JSON serialization.
+        Records the current weights in the snapshot store (a no-op if identical weights are stored)
+        and returns their ID. Called whenever the weights change.
         """
-        state_dict = self.policy_net.state_dict()
-        state_dict_json = {}
-        for key, tensor in state_dict.items():
-            # Move tensor to CPU and convert to list.
-            state_dict_json[key] = tensor.cpu().tolist()
-        # Ensure that the directory exists.
-        os.makedirs(os.path.dirname(self.policy_file), exist_ok=True)
-        with open(self.policy_file, "w") as f:
-            json.dump(state_dict_json, f)
-        # print(f"Policy saved to {self.policy_file}")
+        snapshot_id = self._stage_snapshot()
+        self._write_snapshots()
+        return snapshot_id
 
-    def dynamic_emotion_vector(self, emotion_results):
+    def _stage_snapshot(self):
+        # Only a CPU copy and the hash happen under the lock; the (delta-compressed) write is left
+        # to _write_snapshots, so select_action never waits on snapshot I/O.
+        with self.lock:
+            state_dict = {key: value.detach().to("cpu", copy=True) for key, value in self.policy_net.state_dict().items()}
+            base = self.policy_hash
+            self.policy_hash = self.snapshots.hash({key: value.numpy() for key, value in state_dict.items()})
+            self.pending_snapshots.append((self.policy_hash, base, state_dict))
+            return self.policy_hash
 
-        # Check if emotion_results is a dict; if so, use its items.
-        if isinstance(emotion_results, dict):
-            # Sort the dictionary items by key (emotion label) to ensure a consistent order.
-            sorted_emotions = sorted(emotion_results.items(), key=lambda x: x[0])
+    def _write_snapshots(self):
+        with self.lock:
+            pending, self.pending_snapshots = self.pending_snapshots, []
+        for snapshot_id, base, state_dict in pending:
+            self.snapshots.put(state_dict, base=base, snapshot_id=snapshot_id)
+
+    def save_policy(self, force=False):
+        """
+        Writes the policy and optimizer state to a binary checkpoint if the save cadence is due (or force is set).
+        The checkpoint is written to a temporary file and atomically renamed, so a crash never leaves a partial file.
+        Actors never write checkpoints; the learner owns them.
+        """
+        if self.actor_link is not None:
+            return
+        with self.lock:
+            due = self.updates_since_save > 0 and (
+                self.updates_since_save >= save_every_updates or
+                time.monotonic() - self.last_save_time >= save_every_seconds)
+            if not (force or due):
+                return
 
-            # Extract scores in sorted order.
-            scores = [score for label, score in sorted_emotions]
-        elif isinstance(emotion_results, list) and emotion_results:
+            with self.tracer.span("rl.save_policy", persona=self.persona_name):
+                checkpoint = {
+                    "policy": self.policy_net.state_dict(),
+                    "optimizer": self.optimizer.state_dict(),
+                    "updates": self.updates
+                }
+                # Ensure that the directory exists.
+                directory = os.path.dirname(self.policy_file)
+                os.makedirs(directory, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+                try:
+                    with os.fdopen(fd, "wb") as f:
+                        torch.save(checkpoint, f)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    os.replace(tmp_path, self.policy_file)
+                except BaseException:
+                    os.remove(tmp_path)
+                    raise
+
+                self.updates_since_save = 0
+                self.last_save_time = time.monotonic()
+                # print(f"Policy saved to {self.policy_file}")
+
+    def dynamic_emotion_vector(self, emotion_results):
+        """
+        Returns the emotion scores as a CPU float32 tensor in EMOTION_FIELDS order.
+        Accepts an EmotionVector, a {label: score} dict, or raw classifier output ([[{label, score}, ...]]).
+        """
+        if isinstance(emotion_results, EmotionVector):
+            return emotion_results.as_tensor()
+        if isinstance(emotion_results, dict):
+            return EmotionVector.from_dict(emotion_results).as_tensor()
+        if isinstance(emotion_results, list) and emotion_results:
             # If emotion_results is a list, assume its first element contains the data.
-            emotions_list = emotion_results[0]
-            
-            # If it's a list of dicts, sort them by label.
-            sorted_emotions = sorted(emotions_list, key=lambda x: x['label'])
-            scores = [entry['score'] for entry in sorted_emotions]
-        else:
-            raise ValueError("No valid emotion results provided.")
-        
-        # Convert the scores list into a PyTorch tensor and move it to CUDA.
-        emotion_tensor = torch.tensor(scores, dtype=torch.float32).to("cuda")
-        
-        return emotion_tensor
+            return EmotionVector.from_dict({entry['label']: entry['score'] for entry in emotion_results[0]}).as_tensor()
+        raise ValueError("No valid emotion results provided.")
 
     def select_action(self, mental_state, embeddings, emotion_results):
         """
         Combines the previous mental state, dialogue embedding, and dynamic emotion vector into a state vector,
         performs a forward pass through the policy network, and samples an action (delta) for updating the mental state.
-        Returns the updated mental state as a dictionary.
+        Returns the updated MentalState.
         """
-        # Convert dialogue embeddings to a torch tensor on CUDA
-        state_embedding = torch.tensor(embeddings, dtype=torch.float32).to("cuda")
+        if self.actor_link is not None:
+            self.actor_link.sync()
+        mental_state = MentalState.from_dict(mental_state)
 
-        # Convert the mental state dictionary to a vector (using sorted keys)
-        mental_keys = sorted(mental_state.keys())
-        mental_state_vector = torch.tensor([mental_state[k] for k in mental_keys], dtype=torch.float32).to("cuda")
-        
-        # Dynamically extract the emotion vector using our helper function
-        emotion_vector = self.dynamic_emotion_vector(emotion_results)
-        
-        # Concatenate the mental state vector, the dialogue embedding, and the emotion vector
-        state = torch.cat([mental_state_vector, state_embedding, emotion_vector], dim=0)
-        state = state.unsqueeze(0)  # Add batch dimension
-        # Forward pass through the policy network
-        action_mean, std, value = self.policy_net(state)
+        # Concatenate the mental state vector, the dialogue embedding, and the emotion vector on the CPU
+        # (zero-copy views of the numpy arrays) and move the state to the device in one transfer.
+        state = torch.cat([
+            mental_state.as_tensor(),
+            torch.from_numpy(np.asarray(embeddings, dtype=np.float32)),
+            self.dynamic_emotion_vector(emotion_results)
+        ], dim=0)
+        state = state.unsqueeze(0).to(self.device)  # Add batch dimension
+        # Forward pass through the policy network (no graph: the PPO update recomputes it).
+        if batched_policy_inference:
+            action_mean, std, value, policy_hash = PolicyExecutor.instance().forward(self, state)
+        else:
+            # The snapshot ID is read with the forward pass, so an update in between cannot mislabel the action.
+            with self.lock, torch.no_grad():
+                action_mean, std, value = self.policy_net(state)
+                policy_hash = self.policy_hash
         # Sample an action from the Gaussian distribution
         dist = Normal(action_mean, std)
         action = dist.sample()
         log_prob = dist.log_prob(action).sum(dim=-1)
-        
-        # Store trajectory components for policy updates
-        self.states.append(state)
-        self.actions.append(action)
-        self.log_probs.append(log_prob)
-        self.values.append(value)
-        
-        # Interpret action as delta for mental state and update accordingly.
-        action_delta = action.squeeze(0)  # Remove batch dimension.
-        updated_mental_state_vector = mental_state_vector + action_delta
-        
-        updated_mental_state = {}
-        for i, key in enumerate(mental_keys):
-            updated_value = updated_mental_state_vector[i].item()
-            updated_mental_state[key] = max(0, min(updated_value, 100))
-        
-        return updated_mental_state
+
+        with self.lock:
+            # Store trajectory components for policy updates
+            self.buffer.add(state[0], action[0], log_prob[0], value[0, 0])
+            self.acting_policy = policy_hash
+
+        # Interpret action as delta for mental state; a single device-to-host copy brings it back.
+        action_delta = action.squeeze(0).cpu().numpy()  # Remove batch dimension.
+        return MentalState(mental_state.values + action_delta).clipped()
 
     def update_policy(self, mental_change_reward, notes_reward, response_reward, response_emotion_reward):
-        # 1. Compute the weighted total reward (using a baseline offset of 75).
-        total_reward = (
-            mental_change_weight * mental_change_reward +
-            notes_weight * notes_reward +
-            response_weight * response_reward +
-            response_emotion_weight * response_emotion_reward
-        )
-        # print(f"Total reward: {total_reward}")
-        self.rewards.append(total_reward)
-
-        # 2. Compute discounted returns for the trajectory.
-        returns = []
-        R = 0
-        for r in reversed(self.rewards):
-            R = r + self.gamma * R
-            returns.insert(0, R)
-        # print(f"Discounted returns (list): {returns}")
-        returns = torch.tensor(returns, dtype=torch.float32)
-        if self.values:
-            returns = returns.to(self.values[0].device)
-        # print(f"Discounted returns (tensor): {returns}")
-
-        # 3. Convert stored trajectories into tensors.
-        states = torch.cat(self.states, dim=0)      # Shape: [batch, input_dim]
-        actions = torch.cat(self.actions, dim=0)      # Shape: [batch, action_dim]
-        old_log_probs = torch.stack(self.log_probs)   # Shape: [batch]
-        values = torch.cat(self.values, dim=0).squeeze()  # Shape: [batch]
-        # print(f"States shape: {states.shape}")
-        # print(f"Actions shape: {actions.shape}")
-        # print(f"Old log_probs shape: {old_log_probs.shape}")
-        # print(f"Values shape: {values.shape}")
-
-        # 4. Normalize returns (using unbiased=False to handle single-element tensors).
-        returns = (returns - returns.mean()) / (returns.std(unbiased=False) + 1e-5)
-        # print(f"Normalized returns: {returns}")
-
-        # 5. Compute advantages.
-        advantages = returns - values.detach()
-        # print(f"Advantages: {advantages}")
-
-        # 6. Forward pass through the policy network.
-        action_means, stds, new_values = self.policy_net(states)
-        # print(f"Action means: {action_means}")
-        # print(f"Standard deviations: {stds}")
-        dist = Normal(action_means, stds)
-        new_log_probs = dist.log_prob(actions).sum(dim=-1)
-        # print(f"New log_probs: {new_log_probs}")
-
-        # 7. Compute the PPO surrogate objective.
-        ratios = torch.exp(new_log_probs - old_log_probs)
-        surr1 = ratios * advantages
-        surr2 = torch.clamp(ratios, 1 - self.clip_epsilon, 1 + self.clip_epsilon) * advantages
-        actor_loss = -torch.min(surr1, surr2).mean()
-        # print(f"Actor loss: {actor_loss.item()}")
-
-        # 8. Compute the critic loss.
-        critic_loss = nn.MSELoss()(new_values.squeeze(), returns)
-        # print(f"Critic loss: {critic_loss.item()}")
-
-        # 9. Total loss.
-        loss = actor_loss + critic_loss
-        # print(f"Total loss: {loss.item()}")
-
-        # 10. Backpropagation step.
-        self.optimizer.zero_grad()
-        loss.backward()
-        self.optimizer.step()
-
-        # 11. Clear trajectory buffers after update.
-        self.states.clear()
-        self.actions.clear()
-        self.log_probs.clear()
-        self.rewards.clear()
-        self.values.clear()
-        # print("Trajectory buffers cleared.")
-        # print(f"Policy updated. Loss: {loss.item():.4f}")
-        self.save_policy()
+        """
+        Records the reward of the oldest pending transition and, once the rollout is full,
+        runs a multi-epoch minibatch PPO update over it.
+        """
+        with self.lock:
+            # Compute the weighted total reward (the validator scores are already offset by 75).
+            total_reward = (
+                mental_change_weight * mental_change_reward +
+                notes_weight * notes_reward +
+                response_weight * response_reward +
+                response_emotion_weight * response_emotion_reward
+            )
+            # print(f"Total reward: {total_reward}")
+            self.buffer.add_reward(total_reward)
+
+            if self.buffer.ready():
+                if self.actor_link is not None:
+                    self.actor_link.send(self, self.buffer.take()[0], episode_end=False)
+                else:
+                    with self.tracer.span("rl.ppo_update", persona=self.persona_name):
+                        self._ppo_update()
+            self.save_policy()
+        self._write_snapshots()
+
+    def discard_pending(self):
+        """
+        Drops the oldest transition still waiting for its reward, e.g. when computing that reward failed,
+        so later rewards stay paired with the transitions they belong to.
+        """
+        with self.lock:
+            return self.buffer.discard_pending()
+
+    def end_episode(self):
+        """
+        Marks the last rewarded transition as terminal so advantages do not leak across games.
+        """
+        with self.lock:
+            self.buffer.end_episode()
+            if self.actor_link is not None:
+                self.actor_link.send(self, self.buffer.take()[0], episode_end=True)
+
+    def ingest(self, segment, episode_end):
+        """
+        Learner side: appends transitions collected by an actor and trains whenever the rollout is full.
+        A full rollout is trained once the next transition is in the buffer, so GAE bootstraps from that
+        state's value, or once the episode has been marked done.
+        """
+        with self.lock:
+            n = segment["rewards"].shape[0]
+            for i in range(n):
+                self.buffer.add(segment["states"][i], segment["actions"][i], segment["log_probs"][i], segment["values"][i])
+                if self.buffer.ready():
+                    with self.tracer.span("rl.ppo_update", persona=self.persona_name):
+                        self._ppo_update()
+                self.buffer.add_reward(segment["rewards"][i])
+            if episode_end:
+                self.buffer.end_episode()
+                if self.buffer.ready():
+                    with self.tracer.span("rl.ppo_update", persona=self.persona_name):
+                        self._ppo_update()
+            self.save_policy()
+        self._write_snapshots()
+
+    def load_weights(self, state_dict, updates):
+        """
+        Actor side: replaces the policy weights with a broadcast from the learner.
+        """
+        with self.lock:
+            self.policy_net.load_state_dict(state_dict)
+            self.updates = updates
+            self._stage_snapshot()
+        self._write_snapshots()
+
+    def _ppo_update(self):
+        batch, last_value = self.buffer.take()
+
+        # 1. Normalize rewards with running statistics.
+        self.reward_stats.update(batch["rewards"])
+        rewards = self.reward_stats.normalize(batch["rewards"])
+
+        # 2. Advantages and returns via vectorized GAE.
+        advantages, returns = compute_gae(rewards, batch["values"], batch["dones"], last_value, self.gamma, self.gae_lambda)
+        advantages = (advantages - advantages.mean()) / (advantages.std(unbiased=False) + 1e-8)
+
+        # 3. Several epochs of shuffled minibatch PPO.
+        n = rewards.shape[0]
+        for _ in range(self.ppo_epochs):
+            permutation = torch.randperm(n, device=rewards.device)
+            for start in range(0, n, self.minibatch_size):
+                index = permutation[start:start + self.minibatch_size]
+
+                action_means, stds, new_values = self.policy_net(batch["states"][index])
+                dist = Normal(action_means, stds)
+                new_log_probs = dist.log_prob(batch["actions"][index]).sum(dim=-1)
+
+                # PPO surrogate objective.
+                ratios = torch.exp(new_log_probs - batch["log_probs"][index])
+                surr1 = ratios * advantages[index]
+                surr2 = torch.clamp(ratios, 1 - self.clip_epsilon, 1 + self.clip_epsilon) * advantages[index]
+                actor_loss = -torch.min(surr1, surr2).mean()
+
+                # Critic loss.
+                critic_loss = nn.MSELoss()(new_values.squeeze(-1), returns[index])
+
+                loss = actor_loss + critic_loss
+                self.optimizer.zero_grad()
+                loss.backward()
+                nn.utils.clip_grad_norm_(self.policy_net.parameters(), self.max_grad_norm)
+                self.optimizer.step()
+
+        self.updates += 1
+        self.updates_since_save += 1
+        # Called with the lock held; the caller writes the snapshot once it has released it.
+        self._stage_snapshot()
+        # print(f"Policy updated over {n} transitions. Loss: {loss.item():.4f}")
@@ -0,0 +1,162 @@
+import torch
+
+class RunningMeanStd:
+    """
+    Running mean and variance (parallel Welford update) used to normalise rewards across updates.
+    """
+    def __init__(self, epsilon=1e-4):
+        self.mean = 0.0
+        self.var = 1.0
+        self.count = epsilon
+
+    def update(self, values):
+        batch_mean = values.mean().item()
+        batch_var = values.var(unbiased=False).item()
+        batch_count = values.numel()
+
+        delta = batch_mean - self.mean
+        total = self.count + batch_count
+        self.mean += delta * batch_count / total
+        m2 = self.var * self.count + batch_var * batch_count + delta ** 2 * self.count * batch_count / total
+        self.var = m2 / total
+        self.count = total
+
+    def normalize(self, values):
+        return (values - self.mean) / (self.var ** 0.5 + 1e-8)
+
+class RolloutBuffer:
+    def __init__(self, capacity, input_dim, action_dim, device, slack=16):
+        """
+        capacity: Number of rewarded transitions that triggers a policy update.
+        slack: Extra slots for transitions whose action was taken but whose reward is still being computed.
+               It must exceed the reward worker's queue bound (persona.reward_queue_size) plus the turn in flight.
+        """
+        self.capacity = capacity
+        size = capacity + slack
+        self.states = torch.zeros(size, input_dim, device=device)
+        self.actions = torch.zeros(size, action_dim, device=device)
+        self.log_probs = torch.zeros(size, device=device)
+        self.values = torch.zeros(size, device=device)
+        self.rewards = torch.zeros(size, device=device)
+        self.dones = torch.zeros(size, device=device)
+        self.size = 0      # Transitions added (acted on).
+        self.rewarded = 0  # Leading transitions that already have their reward.
+
+    def add(self, state, action, log_prob, value):
+        if self.size == self.states.shape[0]:
+            # Rewards were lost or an update was skipped: make room rather than stop the game.
+            if self.discard_pending():
+                print("[WARNING] RolloutBuffer: Full of transitions waiting for rewards, evicted the oldest one.")
+            else:
+                dropped = self.take()[0]["rewards"].shape[0]
+                print(f"[WARNING] RolloutBuffer: Full, dropped {dropped} rewarded transitions that were never trained on.")
+        self.states[self.size] = state
+        self.actions[self.size] = action
+        self.log_probs[self.size] = log_prob
+        self.values[self.size] = value
+        self.dones[self.size] = 0
+        self.size += 1
+
+    def add_reward(self, reward):
+        """
+        Assigns the reward to the oldest transition that does not have one yet.
+        """
+        if self.rewarded == self.size:
+            raise RuntimeError("Received a reward without a pending transition.")
+        self.rewards[self.rewarded] = reward
+        self.rewarded += 1
+
+    def discard_pending(self):
+        """
+        Drops the oldest transition that does not have its reward yet (its reward will never arrive).
+        Returns False if there is none.
+        """
+        if self.rewarded == self.size:
+            return False
+        i = self.rewarded
+        for tensor in (self.states, self.actions, self.log_probs, self.values, self.dones):
+            tensor[i:self.size - 1] = tensor[i + 1:self.size].clone()
+        self.size -= 1
+        return True
+
+    def end_episode(self):
+        if self.rewarded > 0:
+            self.dones[self.rewarded - 1] = 1
+
+    def ready(self):
+        return self.rewarded >= self.capacity
+
+    def take(self):
+        """
+        Returns the rewarded transitions plus the value of the next pending state (bootstrap for GAE),
+        and moves any pending transitions to the front of the buffer.
+        """
+        n = self.rewarded
+        batch = {
+            "states": self.states[:n].clone(),
+            "actions": self.actions[:n].clone(),
+            "log_probs": self.log_probs[:n].clone(),
+            "values": self.values[:n].clone(),
+            "rewards": self.rewards[:n].clone(),
+            "dones": self.dones[:n].clone(),
+        }
+        last_value = self.values[n] if self.size > n else torch.zeros((), device=self.values.device)
+
+        pending = self.size - n
+        for tensor in (self.states, self.actions, self.log_probs, self.values, self.dones):
+            tensor[:pending] = tensor[n:self.size].clone()
+        self.size = pending
+        self.rewarded = 0
+        return batch, last_value
+
+# Steps per block of the segmented scan in compute_gae: work and memory are O(n * gae_block).
+gae_block = 64
+
+def reverse_linear_scan(b, a, block=gae_block):
+    """
+    Solves x_i = b_i + a_i * x_{i+1} (x_n = 0) for all i without a Python loop over the steps.
+    Each block of steps is solved with one batched matrix product; the values carried from one block
+    into the previous form the same recurrence one level up, which is solved recursively.
+    """
+    n = b.shape[0]
+    if n == 0:
+        return b
+    pad = (-n) % block
+    # Padding with a = 0 cuts the recurrence, so padded steps never reach the real ones.
+    b = torch.nn.functional.pad(b, (0, pad)).view(-1, block)
+    a = torch.nn.functional.pad(a, (0, pad)).view(-1, block)
+
+    # prod_{m=i}^{j-1} a_m from exclusive prefix sums of log(a), with zeros tracked by count.
+    zero = a == 0
+    log_a = torch.log(torch.where(zero, torch.ones_like(a), a))
+    log_sum = torch.cumsum(log_a, dim=1) - log_a
+    zeros = torch.cumsum(zero.to(b.dtype), dim=1) - zero.to(b.dtype)
+    upper = torch.ones(block, block, dtype=torch.bool, device=b.device).triu()
+    mask = upper & (zeros.unsqueeze(1) == zeros.unsqueeze(2))           # [blocks, i, j]
+    log_products = log_sum.unsqueeze(1) - log_sum.unsqueeze(2)
+    products = torch.exp(log_products.masked_fill(~mask, float("-inf")))
+    local = torch.bmm(products, b.unsqueeze(-1)).squeeze(-1)
+    if local.shape[0] == 1:
+        return local.reshape(-1)[:n]
+
+    # Weight of the next block's first value in every step: prod_{m=i}^{block-1} a_m.
+    total_log = log_sum[:, -1:] + log_a[:, -1:]
+    total_zeros = zeros[:, -1:] + zero[:, -1:].to(b.dtype)
+    carry = torch.where(zeros == total_zeros, torch.exp(total_log - log_sum), torch.zeros_like(b))
+
+    starts = reverse_linear_scan(local[:, 0], carry[:, 0], block)
+    next_starts = torch.cat([starts[1:], starts.new_zeros(1)])
+    x = local + carry * next_starts.unsqueeze(1)
+    return x.reshape(-1)[:n]
+
+def compute_gae(rewards, values, dones, last_value, gamma, lam):
+    """
+    Vectorized generalized advantage estimation.
+    A_i = delta_i + gamma * lam * (1 - done_i) * A_{i+1}, solved as a segmented reverse scan
+    (see reverse_linear_scan), so time and memory stay linear in the rollout length.
+    Returns (advantages, returns).
+    """
+    next_values = torch.cat([values[1:], last_value.reshape(1)]) * (1 - dones)
+    deltas = rewards + gamma * next_values - values
+    advantages = reverse_linear_scan(deltas, gamma * lam * (1 - dones))
+    return advantages, advantages + values
@@ -0,0 +1,51 @@
+import time
+import hashlib
+import numpy as np
+from ..ai.mental_state import EMOTION_FIELDS
+from ..ai.model_registry import ModelRegistry
+from ..ai.backends import stub as stub_backend
+
+def text_seed(text):
+    return int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:8], "little")
+
+class StubEmotionClassifier:
+    """
+    Stands in for the emotion text-classification pipeline (top_k=None output format).
+    """
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def __call__(self, text):
+        time.sleep(self.latency)
+        rng = np.random.default_rng(text_seed(text))
+        scores = rng.dirichlet(np.ones(len(EMOTION_FIELDS)))
+        return [[{"label": label, "score": float(score)} for label, score in zip(EMOTION_FIELDS, scores)]]
+
+class StubSentenceTransformer:
+    """
+    Stands in for the SentenceTransformer: a unit-length embedding derived from the text.
+    """
+    def __init__(self, latency=0.0, dim=768):
+        self.latency = latency
+        self.dim = dim
+
+    def encode(self, text):
+        time.sleep(self.latency)
+        rng = np.random.default_rng(text_seed(text))
+        embedding = rng.standard_normal(self.dim).astype(np.float32)
+        return embedding / np.linalg.norm(embedding)
+
+def install_stubs(llm_batch_latency=0.0, llm_token_latency=0.0, model_latency=0.0):
+    """
+    Routes the LLM to the stub backend and the ModelRegistry to the stub perception models.
+    Must run before the first LLM() or ModelRegistry model is created.
+    """
+    from ..ai.llm import LLM
+
+    stub_backend.batch_latency = llm_batch_latency
+    stub_backend.token_latency = llm_token_latency
+    LLM(model_name="stub", backend="stub")
+
+    registry = ModelRegistry.instance()
+    registry.loaders["emotion_classifier"] = lambda: StubEmotionClassifier(model_latency)
+    registry.loaders["sentence_transformer"] = lambda: StubSentenceTransformer(model_latency)
@@ -0,0 +1,151 @@
+import io
+import os
+import json
+import random
+import resource
+import tempfile
+import time
+import contextlib
+import multiprocessing as mp
+from queue import Empty
+
+personas_folder = os.path.join(os.path.dirname(__file__), "..", "game", "player", "personas")
+
+# name -> npcs per game, turns per game, messages of prior history, games (epochs), games run at once
+SCENARIOS = {
+    "2npc_10turns": {"npcs": 2, "turns": 10},
+    "2npc_100turns": {"npcs": 2, "turns": 100},
+    "4npc_100turns": {"npcs": 4, "turns": 100},
+    "8npc_100turns": {"npcs": 8, "turns": 100},
+    "2npc_1000turns": {"npcs": 2, "turns": 1000},
+    "long_history": {"npcs": 2, "turns": 50, "history": 2000},
+    "training_epochs": {"npcs": 2, "turns": 10, "epochs": 20},
+    "parallel_games": {"npcs": 2, "turns": 20, "epochs": 8, "parallel": 4},
+}
+
+# Relative slowdown (turns/sec) or growth (peak RSS) tolerated against the baseline.
+default_tolerance = 0.10
+
+def run_scenario(name, scenario, latencies, seed):
+    """
+    Plays one scenario with stub models and returns its measurements. Runs in a fresh process
+    (see run_suite) so singletons, caches and the peak RSS do not leak between scenarios.
+    """
+    import numpy as np
+    import torch
+    from ..ai import rl as rl_module
+    from ..ai.model_registry import ModelRegistry
+    from ..data.tracer import Tracer
+    from ..game.game import Game
+    from ..game.scheduler import GameScheduler
+    from ..game.player.persona_pool import PersonaPool
+    from .stubs import install_stubs
+
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+    install_stubs(**latencies)
+    ModelRegistry.instance().warmup()
+
+    npcs = scenario["npcs"]
+    turns = scenario["turns"]
+    history = scenario.get("history", 0)
+    epochs = scenario.get("epochs", 1)
+    persona_files = sorted(f for f in os.listdir(personas_folder) if f.endswith(".json"))[:npcs]
+    if len(persona_files) < npcs:
+        raise ValueError(f"Scenario {name} needs {npcs} personas, only {len(persona_files)} available.")
+
+    with tempfile.TemporaryDirectory() as trained_dir:
+        # Fresh policies every run, and the real checkpoints are never touched.
+        rl_module.trained_dir = trained_dir
+        pool = PersonaPool()
+
+        def make_game(epoch, rng):
+            game = Game()
+            for persona_file in persona_files:
+                game.add_player(pool.acquire(os.path.join(personas_folder, persona_file)))
+            for i in range(history):
+                speaker = game.players[i % npcs]['player'].name
+                game.chat.add_turn(speaker, f"Earlier message {i} from {speaker} about job {rng.randrange(100)}.")
+            return game
+
+        tracer = Tracer.instance()
+        tracer.enable()
+        scheduler = GameScheduler(num_games=scenario.get("parallel", 1), base_seed=seed, keep_records=False, pool=pool)
+        start = time.perf_counter()
+        # The pipeline's [DEBUG] prints are still formatted, just not shown.
+        with contextlib.redirect_stdout(io.StringIO()):
+            scheduler.run(make_game, epochs, turns)
+        elapsed = time.perf_counter() - start
+
+    stages = {stage: {"p50_ms": s["p50_ms"], "p95_ms": s["p95_ms"], "count": s["count"]}
+              for stage, s in tracer.summary().items()}
+    return {
+        "scenario": scenario,
+        "turns": epochs * turns,
+        "seconds": elapsed,
+        "turns_per_sec": epochs * turns / elapsed,
+        # ru_maxrss is in KiB on Linux.
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "stages": stages
+    }
+
+def _run_in_process(name, scenario, latencies, seed, results):
+    results.put((name, run_scenario(name, scenario, latencies, seed)))
+
+def run_suite(names, latencies, seed=0):
+    """
+    Runs the named scenarios one after another, each in its own spawned process.
+    Returns {scenario_name: measurements}.
+    """
+    ctx = mp.get_context("spawn")
+    results = {}
+    for name in names:
+        queue = ctx.Queue()
+        process = ctx.Process(target=_run_in_process, args=(name, SCENARIOS[name], latencies, seed, queue), name=f"Bench-{name}")
+        process.start()
+        result = None
+        while result is None:
+            try:
+                _, result = queue.get(timeout=1.0)
+            except Empty:
+                if not process.is_alive():
+                    raise RuntimeError(f"Benchmark scenario {name} exited with code {process.exitcode}")
+        process.join()
+        results[name] = result
+        print(f"[INFO] Benchmark: {name}: {result['turns_per_sec']:.2f} turns/sec, peak RSS {result['peak_rss_mb']:.0f} MB")
+    return results
+
+def compare(results, baseline, tolerance=default_tolerance):
+    """
+    Returns a list of regression messages (empty if every scenario is within tolerance of the baseline).
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result["turns_per_sec"] < base["turns_per_sec"] * (1 - tolerance):
+            regressions.append(f"{name}: {result['turns_per_sec']:.2f} turns/sec vs baseline {base['turns_per_sec']:.2f}")
+        if result["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{name}: peak RSS {result['peak_rss_mb']:.0f} MB vs baseline {base['peak_rss_mb']:.0f} MB")
+    return regressions
+
+def format_results(results, baseline=None):
+    lines = [f"{'scenario':<18}{'turns':>7}{'turns/sec':>12}{'vs base':>9}{'peak RSS MB':>13}"]
+    for name, result in results.items():
+        delta = ""
+        if baseline and name in baseline:
+            delta = f"{result['turns_per_sec'] / baseline[name]['turns_per_sec'] - 1:+.0%}"
+        lines.append(f"{name:<18}{result['turns']:>7}{result['turns_per_sec']:>12.2f}{delta:>9}{result['peak_rss_mb']:>13.0f}")
+        for stage, s in sorted(result["stages"].items()):
+            lines.append(f"    {stage:<26}p50 {s['p50_ms']:>9.2f} ms   p95 {s['p95_ms']:>9.2f} ms   n={s['count']}")
+    return "\n".join(lines)
+
+def load_results(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_results(results, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=4)
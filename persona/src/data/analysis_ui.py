@@ -8,6 +8,7 @@ from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolb
 from sklearn.decomposition import PCA
 import matplotlib.pyplot as plt
 from scipy.stats import pearsonr
+from collections.abc import Mapping
 from .record_keeper import RecordKeeper
 
 def reduce_to_3d(df):
@@ -251,9 +252,9 @@ class AnalysisUI:
             for turn in record.records:
                 dict1 = getattr(turn, field1, {}) or {}
                 dict2 = getattr(turn, field2, {}) or {}
-                if isinstance(dict1, dict):
+                if isinstance(dict1, Mapping):
                     subkeys1.update(dict1.keys())
-                if isinstance(dict2, dict):
+                if isinstance(dict2, Mapping):
                     subkeys2.update(dict2.keys())
         subkeys1 = sorted(list(subkeys1))
         subkeys2 = sorted(list(subkeys2))
@@ -267,8 +268,8 @@ class AnalysisUI:
                     for turn in record.records:
                         dict1 = getattr(turn, field1, {}) or {}
                         dict2 = getattr(turn, field2, {}) or {}
-                        x = dict1.get(key1, default) if isinstance(dict1, dict) else default
-                        y = dict2.get(key2, default) if isinstance(dict2, dict) else default
+                        x = dict1.get(key1, default) if isinstance(dict1, Mapping) else default
+                        y = dict2.get(key2, default) if isinstance(dict2, Mapping) else default
                         x_values.append(x)
                         y_values.append(y)
                 if len(x_values) > 1:
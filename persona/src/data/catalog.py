@@ -0,0 +1,316 @@
+import os
+import json
+import sqlite3
+import threading
+from .prompt_template import expand_prompt
+
+REWARD_COLUMNS = ("reward_mental_change", "notes_reward", "response_reward", "response_emotion_reward")
+
+# JSON files of a run that never hold records (run config, Chrome trace).
+NON_RECORD_FILES = ("config.json", "trace.json")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    run_id INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    offset INTEGER NOT NULL          -- bytes of a .jsonl segment already ingested
+);
+CREATE TABLE IF NOT EXISTS records (
+    record_id TEXT PRIMARY KEY,
+    run_id INTEGER NOT NULL,
+    persona_name TEXT,
+    epoch INTEGER,
+    turns INTEGER NOT NULL DEFAULT 0,
+    ended INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS turns (
+    turn_id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL,
+    epoch INTEGER,
+    record_id TEXT NOT NULL,
+    persona_name TEXT,
+    turn_index INTEGER NOT NULL,
+    episode_end INTEGER NOT NULL DEFAULT 0,
+    policy_version TEXT,
+    reward_mental_change REAL,
+    notes_reward REAL,
+    response_reward REAL,
+    response_emotion_reward REAL,
+    path TEXT NOT NULL,
+    position INTEGER NOT NULL        -- byte offset of the line (.jsonl) or index in "records" (.json)
+);
+CREATE TABLE IF NOT EXISTS templates (
+    template_id TEXT PRIMARY KEY,
+    template TEXT NOT NULL           -- PromptTemplate.to_dict() as JSON
+);
+CREATE INDEX IF NOT EXISTS turns_run_epoch ON turns (run_id, epoch);
+CREATE INDEX IF NOT EXISTS turns_persona_turn ON turns (persona_name, turn_index);
+CREATE INDEX IF NOT EXISTS turns_record ON turns (record_id, turn_index);
+CREATE INDEX IF NOT EXISTS turns_policy ON turns (policy_version);
+CREATE INDEX IF NOT EXISTS turns_reward_mental_change ON turns (persona_name, reward_mental_change);
+CREATE INDEX IF NOT EXISTS turns_notes_reward ON turns (persona_name, notes_reward);
+CREATE INDEX IF NOT EXISTS turns_response_reward ON turns (persona_name, response_reward);
+CREATE INDEX IF NOT EXISTS turns_response_emotion_reward ON turns (persona_name, response_emotion_reward);
+"""
+
+class CatalogTurn:
+    """
+    One indexed turn. The indexed fields are attributes; load() reads the full turn dict from its source file,
+    with the prompt expanded to its full text.
+    """
+    def __init__(self, row, catalog):
+        self.catalog = catalog
+        (self.turn_id, self.run, self.epoch, self.record_id, self.persona_name, self.turn_index,
+         episode_end, self.policy_version, self.reward_mental_change, self.notes_reward,
+         self.response_reward, self.response_emotion_reward, self.path, self.position) = row
+        self.episode_end = bool(episode_end)
+
+    def load(self):
+        if self.path.endswith(".jsonl"):
+            with open(self.path, "rb") as f:
+                f.seek(self.position)
+                turn = json.loads(f.readline())["turn"]
+            prompt = turn.get("prompt")
+            if isinstance(prompt, dict):
+                expand_prompt(turn, self.catalog.templates([prompt.get("template_id")]))
+            return turn
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return expand_prompt(data["records"][self.position], data.get("templates", {}))
+
+class RunCatalog:
+    """
+    SQLite index over every saved run under root (one run per top-level folder): record JSON dumps
+    (saved/chat - <date>/...) and RecordSink turn logs (saved/run - <date>/..., headless output dirs).
+    ingest() only reads what is new since the last call: appended segment lines, new or changed files.
+    """
+    def __init__(self, root, db_path=None):
+        self.root = os.path.abspath(root)
+        self.db_path = db_path or os.path.join(self.root, "catalog.sqlite")
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def ingest(self):
+        """
+        Indexes new runs, files and appended turns. Returns the number of turns added.
+        """
+        added = 0
+        with self.lock, self.db:
+            for run_name in sorted(os.listdir(self.root)):
+                run_dir = os.path.join(self.root, run_name)
+                if not os.path.isdir(run_dir):
+                    continue
+                run_id = self._run_id(run_name)
+                epochs = self._headless_epochs(run_dir)
+                for directory, _, files in sorted(os.walk(run_dir)):
+                    for file_name in sorted(files):
+                        path = os.path.join(directory, file_name)
+                        if file_name.endswith(".jsonl") and file_name.startswith("segment-"):
+                            added += self._ingest_segment(run_id, path, epochs)
+                        elif file_name.endswith(".json") and file_name not in NON_RECORD_FILES:
+                            added += self._ingest_record_file(run_id, path)
+        print(f"[INFO] RunCatalog: Indexed {added} new turns.")
+        return added
+
+    def runs(self):
+        return [name for (name,) in self.db.execute("SELECT name FROM runs ORDER BY name")]
+
+    def personas(self):
+        return [name for (name,) in self.db.execute(
+            "SELECT DISTINCT persona_name FROM records WHERE persona_name IS NOT NULL ORDER BY persona_name")]
+
+    def query(self, persona=None, run=None, epoch=None, turn=None, policy_version=None, limit=None, **reward_ranges):
+        """
+        Yields matching CatalogTurns lazily, in run / record / turn order.
+        persona, run (name), epoch, turn (turn index), policy_version: exact matches.
+        turn and epoch also accept an inclusive (low, high) range.
+        <reward column>=(low, high): low <= reward < high; either bound may be None,
+            e.g. query(persona="Victor Sloan", response_reward=(None, 0)).
+        """
+        clauses, params = [], []
+
+        def add(condition, value):
+            clauses.append(condition)
+            params.append(value)
+
+        for column, value in (("t.persona_name", persona), ("r.name", run), ("t.policy_version", policy_version)):
+            if value is not None:
+                add(f"{column} = ?", value)
+        for column, value in (("t.epoch", epoch), ("t.turn_index", turn)):
+            if isinstance(value, tuple):
+                if value[0] is not None:
+                    add(f"{column} >= ?", value[0])
+                if value[1] is not None:
+                    add(f"{column} <= ?", value[1])
+            elif value is not None:
+                add(f"{column} = ?", value)
+        for column, (low, high) in reward_ranges.items():
+            if column not in REWARD_COLUMNS:
+                raise ValueError(f"Unknown filter '{column}'. Reward filters: {', '.join(REWARD_COLUMNS)}")
+            if low is not None:
+                add(f"t.{column} >= ?", low)
+            if high is not None:
+                add(f"t.{column} < ?", high)
+
+        sql = (
+            "SELECT t.turn_id, r.name, t.epoch, t.record_id, t.persona_name, t.turn_index, t.episode_end, "
+            "t.policy_version, t.reward_mental_change, t.notes_reward, t.response_reward, "
+            "t.response_emotion_reward, t.path, t.position "
+            "FROM turns t JOIN runs r ON r.run_id = t.run_id"
+        )
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY t.run_id, t.record_id, t.turn_index"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        for row in self.db.execute(sql, params):
+            yield CatalogTurn(row, self)
+
+    def count(self, **filters):
+        return sum(1 for _ in self.query(**filters))
+
+    def templates(self, template_ids):
+        """
+        Returns {template_id: template dict} for the given IDs that have been indexed.
+        """
+        templates = {}
+        for template_id in template_ids:
+            row = self.db.execute("SELECT template FROM templates WHERE template_id = ?", (template_id,)).fetchone()
+            if row is not None:
+                templates[template_id] = json.loads(row[0])
+        return templates
+
+    def _run_id(self, name):
+        self.db.execute("INSERT OR IGNORE INTO runs (name) VALUES (?)", (name,))
+        return self.db.execute("SELECT run_id FROM runs WHERE name = ?", (name,)).fetchone()[0]
+
+    def _headless_epochs(self, run_dir):
+        # The headless runner's games.jsonl maps each record to its game (epoch).
+        epochs = {}
+        path = os.path.join(run_dir, "games.jsonl")
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        game = json.loads(line)
+                    except ValueError:
+                        continue
+                    for persona in game.get("personas", {}).values():
+                        if isinstance(persona, dict) and "record_id" in persona:
+                            epochs[persona["record_id"]] = game["epoch"]
+        return epochs
+
+    def _file_state(self, path):
+        return self.db.execute("SELECT size, mtime, offset FROM files WHERE path = ?", (path,)).fetchone()
+
+    def _set_file_state(self, run_id, path, size, mtime, offset):
+        self.db.execute("INSERT OR REPLACE INTO files (path, run_id, size, mtime, offset) VALUES (?, ?, ?, ?, ?)",
+                        (path, run_id, size, mtime, offset))
+
+    def _record(self, run_id, record_id, persona_name, epochs):
+        row = self.db.execute("SELECT turns, epoch FROM records WHERE record_id = ?", (record_id,)).fetchone()
+        epoch = epochs.get(record_id)
+        if row is not None:
+            if epoch is not None and epoch != row[1]:
+                # games.jsonl got the game's line after the record was first indexed.
+                self.db.execute("UPDATE records SET epoch = ? WHERE record_id = ?", (epoch, record_id))
+                self.db.execute("UPDATE turns SET epoch = ? WHERE record_id = ?", (epoch, record_id))
+                return row[0], epoch
+            return row
+        if epoch is None:
+            # Without a game index, the n-th record of a persona in a run is its n-th epoch.
+            epoch = self.db.execute("SELECT COUNT(*) FROM records WHERE run_id = ? AND persona_name IS ?",
+                                    (run_id, persona_name)).fetchone()[0] + 1
+        self.db.execute("INSERT INTO records (record_id, run_id, persona_name, epoch) VALUES (?, ?, ?, ?)",
+                        (record_id, run_id, persona_name, epoch))
+        return 0, epoch
+
+    def _insert_turn(self, run_id, epoch, record_id, persona_name, turn_index, turn, path, position, episode_end=False):
+        self.db.execute(
+            "INSERT INTO turns (run_id, epoch, record_id, persona_name, turn_index, episode_end, policy_version, "
+            "reward_mental_change, notes_reward, response_reward, response_emotion_reward, path, position) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (run_id, epoch, record_id, persona_name, turn_index, int(episode_end), turn.get("policy_version"),
+             *(turn.get(column) for column in REWARD_COLUMNS), path, position))
+
+    def _ingest_segment(self, run_id, path, epochs):
+        stat = os.stat(path)
+        state = self._file_state(path)
+        offset = state[2] if state else 0
+        if offset >= stat.st_size:
+            return 0
+
+        added = 0
+        with open(path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break   # still being written; picked up by the next ingest
+                position = offset
+                offset += len(line)
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if "template" in entry:
+                    self._insert_template(entry["template_id"], entry["template"])
+                    continue
+                record_id = entry.get("record_id")
+                persona_name = entry.get("persona_name")
+                turns, epoch = self._record(run_id, record_id, persona_name, epochs)
+                if entry.get("end"):
+                    self.db.execute("UPDATE records SET ended = 1 WHERE record_id = ?", (record_id,))
+                    self.db.execute("UPDATE turns SET episode_end = 1 WHERE record_id = ? AND turn_index = ?",
+                                    (record_id, turns - 1))
+                    continue
+                self._insert_turn(run_id, epoch, record_id, persona_name, turns, entry["turn"], path, position)
+                self.db.execute("UPDATE records SET turns = ? WHERE record_id = ?", (turns + 1, record_id))
+                added += 1
+        self._set_file_state(run_id, path, stat.st_size, stat.st_mtime, offset)
+        return added
+
+    def _insert_template(self, template_id, template):
+        self.db.execute("INSERT OR IGNORE INTO templates (template_id, template) VALUES (?, ?)",
+                        (template_id, json.dumps(template, ensure_ascii=False)))
+
+    def _ingest_record_file(self, run_id, path):
+        stat = os.stat(path)
+        state = self._file_state(path)
+        if state and state[0] == stat.st_size and state[1] == stat.st_mtime:
+            return 0
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[WARNING] RunCatalog: Skipping {path}: {e}")
+            data = None
+        if not isinstance(data, dict) or "records" not in data:
+            # Remembered as seen, so an unchanged non-record file is not parsed again on every ingest.
+            self._set_file_state(run_id, path, stat.st_size, stat.st_mtime, 0)
+            return 0
+
+        # A rewritten dump replaces what was indexed from it before.
+        record_id = os.path.relpath(path, self.root)
+        self.db.execute("DELETE FROM turns WHERE record_id = ?", (record_id,))
+        self.db.execute("DELETE FROM records WHERE record_id = ?", (record_id,))
+        persona_name = data.get("persona_name")
+        for template_id, template in data.get("templates", {}).items():
+            self._insert_template(template_id, template)
+        _, epoch = self._record(run_id, record_id, persona_name, {})
+        records = data["records"]
+        for i, turn in enumerate(records):
+            self._insert_turn(run_id, epoch, record_id, persona_name, i, turn, path, i, episode_end=i == len(records) - 1)
+        self.db.execute("UPDATE records SET turns = ?, ended = 1 WHERE record_id = ?", (len(records), record_id))
+        self._set_file_state(run_id, path, stat.st_size, stat.st_mtime, 0)
+        return len(records)
@@ -0,0 +1,273 @@
+import os
+import json
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from .record_sink import SEGMENT_PATTERN, iter_logged_turns
+from .prompt_template import expand_prompt
+
+# Kept in sync with src/ai/mental_state.py (not imported so readers never load torch).
+MENTAL_STATE_FIELDS = ("anxiety", "arousal", "confidence", "dominance", "guilt", "valence")
+EMOTION_FIELDS = ("anger", "disgust", "fear", "joy", "neutral", "sadness", "surprise")
+
+REWARD_COLUMNS = ("reward_mental_change", "notes_reward", "response_reward", "response_emotion_reward")
+TEXT_COLUMNS = ("input_message", "notes", "prompt", "response")
+# Turn dict key -> (column prefix, fields) of the fixed-width vectors, stored one float32 column per field.
+VECTOR_COLUMNS = {
+    "prev_mental_state": ("prev_mental_state", MENTAL_STATE_FIELDS),
+    "mental_change": ("mental_change", MENTAL_STATE_FIELDS),
+    "input_message_emotion": ("input_message_emotion", EMOTION_FIELDS),
+    "response_emotion": ("response_emotion", EMOTION_FIELDS),
+}
+
+TURNS_FILE = "turns.parquet"
+EMBEDDINGS_FILE = "embeddings.npy"
+
+def _text():
+    return pa.dictionary(pa.int32(), pa.string())
+
+SCHEMA = pa.schema(
+    [("record_id", _text()), ("persona_name", _text()), ("turn_index", pa.int32()), ("episode_end", pa.bool_()),
+     ("policy_version", _text())] +
+    [(column, pa.float32()) for column in REWARD_COLUMNS] +
+    [(f"{prefix}.{field}", pa.float32()) for prefix, fields in VECTOR_COLUMNS.values() for field in fields] +
+    [(column, _text()) for column in TEXT_COLUMNS]
+)
+
+class ColumnarWriter:
+    """
+    Writes turns to a run directory as
+        turns.parquet    one row per turn: typed reward / mental state / emotion columns and
+                         dictionary-encoded text columns, written in row groups as turns arrive
+        embeddings.npy   float16 or float32 [turns, dim] matrix (row i belongs to row i of turns.parquet)
+    """
+    def __init__(self, directory, embedding_dtype=np.float32, row_group_size=4096):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.embedding_dtype = np.dtype(embedding_dtype)
+        self.row_group_size = row_group_size
+        self.writer = pq.ParquetWriter(os.path.join(directory, TURNS_FILE), SCHEMA)
+        # Embeddings are streamed raw and wrapped in an .npy header on close, once the row count is known.
+        self.raw_path = os.path.join(directory, EMBEDDINGS_FILE + ".raw")
+        self.raw = open(self.raw_path, "wb")
+        self.embedding_dim = None
+        self.missing_embeddings = 0   # leading turns without an embedding, written once the dim is known
+        self.rows = {name: [] for name in SCHEMA.names}
+        self.turn_counts = {}
+        self.count = 0
+
+    def append(self, record_id, persona_name, turn, episode_end=False):
+        turn_index = self.turn_counts.get(record_id, 0)
+        if episode_end:
+            self.turn_counts.pop(record_id, None)
+        else:
+            self.turn_counts[record_id] = turn_index + 1
+        row = self.rows
+        row["record_id"].append(record_id)
+        row["persona_name"].append(persona_name)
+        row["turn_index"].append(turn_index)
+        row["episode_end"].append(bool(episode_end))
+        row["policy_version"].append(turn.get("policy_version"))
+        for column in REWARD_COLUMNS:
+            row[column].append(turn.get(column))
+        for key, (prefix, fields) in VECTOR_COLUMNS.items():
+            values = {k.lower(): v for k, v in (turn.get(key) or {}).items()}
+            for field in fields:
+                row[f"{prefix}.{field}"].append(values.get(field))
+        for column in TEXT_COLUMNS:
+            row[column].append(turn.get(column))
+
+        embedding = turn.get("input_message_embedding")
+        if self.embedding_dim is None:
+            if embedding is None:
+                self.missing_embeddings += 1
+            else:
+                # The first real embedding fixes the width; the turns before it get zero rows.
+                self.embedding_dim = len(embedding)
+                self.raw.write(np.zeros((self.missing_embeddings, self.embedding_dim), dtype=self.embedding_dtype).tobytes())
+                self.missing_embeddings = 0
+        if self.embedding_dim is not None:
+            if embedding is None or len(embedding) != self.embedding_dim:
+                embedding = np.zeros(self.embedding_dim)
+            self.raw.write(np.asarray(embedding, dtype=self.embedding_dtype).tobytes())
+
+        self.count += 1
+        if len(row["turn_index"]) >= self.row_group_size:
+            self._flush()
+
+    def close(self):
+        self._flush()
+        self.writer.close()
+        self.raw.close()
+        shape = (self.count, self.embedding_dim or 0)
+        matrix = np.lib.format.open_memmap(os.path.join(self.directory, EMBEDDINGS_FILE), mode="w+",
+                                           dtype=self.embedding_dtype, shape=shape)
+        if matrix.size:
+            matrix[:] = np.memmap(self.raw_path, dtype=self.embedding_dtype, mode="r", shape=shape)
+        matrix.flush()
+        del matrix
+        os.remove(self.raw_path)
+
+    def _flush(self):
+        if not self.rows["turn_index"]:
+            return
+        arrays = []
+        for field in SCHEMA:
+            values = self.rows[field.name]
+            if pa.types.is_dictionary(field.type):
+                arrays.append(pa.array(values, type=pa.string()).dictionary_encode())
+            else:
+                arrays.append(pa.array(values, type=field.type))
+        self.writer.write_table(pa.Table.from_arrays(arrays, schema=SCHEMA))
+        self.rows = {name: [] for name in SCHEMA.names}
+
+def iter_run_turns(root):
+    """
+    Yields (record_id, persona_name, turn_dict, is_last) from saved Record JSON dumps and RecordSink segments under root.
+    """
+    paths = [root] if os.path.isfile(root) else [
+        os.path.join(directory, file_name)
+        for directory, _, files in sorted(os.walk(root)) for file_name in sorted(files)]
+    segment_paths = []
+    for path in paths:
+        if path.endswith(".jsonl"):
+            # Only turn-log segments; e.g. a headless run's games.jsonl holds no turns.
+            if SEGMENT_PATTERN.match(os.path.basename(path)):
+                segment_paths.append(path)
+            continue
+        if not path.endswith(".json"):
+            continue
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[WARNING] Columnar: Skipping {path}: {e}")
+            continue
+        if not isinstance(data, dict) or "records" not in data:
+            continue
+        records = data["records"]
+        templates = data.get("templates", {})
+        for i, turn in enumerate(records):
+            yield os.path.relpath(path, root), data.get("persona_name"), expand_prompt(turn, templates), i == len(records) - 1
+    yield from iter_logged_turns(segment_paths, with_record_id=True)
+
+def convert_run(source, directory, embedding_dtype=np.float32):
+    """
+    Converts the saved records / turn log under source into a columnar run in directory.
+    Returns the number of turns written.
+    """
+    writer = ColumnarWriter(directory, embedding_dtype)
+    try:
+        for record_id, persona_name, turn, is_last in iter_run_turns(source):
+            writer.append(record_id, persona_name, turn, is_last)
+    finally:
+        writer.close()
+    return writer.count
+
+class ColumnarRun:
+    """
+    Lazy reader of a columnar run: columns are read from Parquet on first access and embeddings are
+    memory-mapped, so opening a run costs nothing until data is touched.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self.file = pq.ParquetFile(os.path.join(directory, TURNS_FILE))
+        self.num_turns = self.file.metadata.num_rows
+        self._columns = {}
+        self._embeddings = None
+
+    def column(self, name):
+        """
+        Returns a numeric column as a numpy array, or a text column as a pyarrow ChunkedArray.
+        """
+        if name not in self._columns:
+            column = self.file.read(columns=[name]).column(0)
+            if pa.types.is_dictionary(column.type) or pa.types.is_string(column.type):
+                self._columns[name] = column
+            else:
+                self._columns[name] = column.to_numpy(zero_copy_only=False)
+        return self._columns[name]
+
+    def matrix(self, key):
+        """
+        Returns one of the fixed-width vectors ("prev_mental_state", "mental_change",
+        "input_message_emotion", "response_emotion") as a [turns, fields] float32 array.
+        """
+        prefix, fields = VECTOR_COLUMNS[key]
+        return np.stack([self.column(f"{prefix}.{field}") for field in fields], axis=1).astype(np.float32)
+
+    @property
+    def embeddings(self):
+        if self._embeddings is None:
+            self._embeddings = np.load(os.path.join(self.directory, EMBEDDINGS_FILE), mmap_mode="r")
+        return self._embeddings
+
+    def records(self):
+        """
+        Returns one lazy ColumnarRecord per recorded episode (record ID), in order of first appearance.
+        """
+        record_ids = self.column("record_id").to_pylist()
+        persona_names = self.column("persona_name").to_pylist()
+        rows = {}
+        for i, record_id in enumerate(record_ids):
+            rows.setdefault(record_id, []).append(i)
+        return [ColumnarRecord(self, record_id, persona_names[indices[0]], indices) for record_id, indices in rows.items()]
+
+class ColumnarRecord:
+    """
+    Record-like view (persona_name, records) over some rows of a ColumnarRun, usable by the record UIs.
+    """
+    def __init__(self, run, record_id, persona_name, rows):
+        self.run = run
+        self.record_id = record_id
+        self.persona_name = persona_name
+        self.records = TurnSequence(run, rows)
+
+    def to_dict(self):
+        return {"persona_name": self.persona_name, "records": [turn.to_dict() for turn in self.records]}
+
+class TurnSequence:
+    def __init__(self, run, rows):
+        self.run = run
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return TurnSequence(self.run, self.rows[index])
+        return TurnView(self.run, self.rows[index])
+
+    def __iter__(self):
+        for row in self.rows:
+            yield TurnView(self.run, row)
+
+class TurnView:
+    """
+    One row of a ColumnarRun, exposing the Turn attributes; values are read on access.
+    """
+    __slots__ = ("run", "row")
+
+    def __init__(self, run, row):
+        self.run = run
+        self.row = row
+
+    def __getattr__(self, name):
+        if name == "input_message_embedding":
+            return self.run.embeddings[self.row]
+        if name in VECTOR_COLUMNS:
+            prefix, fields = VECTOR_COLUMNS[name]
+            return {field: float(self.run.column(f"{prefix}.{field}")[self.row]) for field in fields}
+        if name in TEXT_COLUMNS or name == "policy_version":
+            return self.run.column(name)[self.row].as_py()
+        if name in REWARD_COLUMNS:
+            value = self.run.column(name)[self.row]
+            return None if np.isnan(value) else float(value)
+        raise AttributeError(name)
+
+    def to_dict(self):
+        data = {name: getattr(self, name) for name in TEXT_COLUMNS + REWARD_COLUMNS + tuple(VECTOR_COLUMNS)}
+        data["input_message_embedding"] = self.input_message_embedding.tolist()
+        data["policy_version"] = self.policy_version
+        return data
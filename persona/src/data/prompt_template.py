@@ -0,0 +1,82 @@
+import json
+import hashlib
+import threading
+
+class PromptTemplate:
+    """
+    A prompt with named holes: literals[0] + fields[0] + literals[1] + ... + literals[-1].
+    """
+    def __init__(self, literals, fields):
+        if len(literals) != len(fields) + 1:
+            raise ValueError("A prompt template needs exactly one more literal than fields.")
+        self.literals = list(literals)
+        self.fields = list(fields)
+        self.template_id = hashlib.sha1(json.dumps([self.literals, self.fields]).encode("utf-8")).hexdigest()[:16]
+
+    def render(self, values):
+        parts = [self.literals[0]]
+        for field, literal in zip(self.fields, self.literals[1:]):
+            parts.append(str(values[field]))
+            parts.append(literal)
+        return "".join(parts)
+
+    def to_dict(self):
+        return {"literals": self.literals, "fields": self.fields}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["literals"], data["fields"])
+
+class TemplateRegistry:
+    """
+    Process-wide table of interned prompt templates, keyed by a hash of their content.
+    """
+    _instance = None
+
+    def __init__(self):
+        self.templates = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def intern(self, template):
+        with self.lock:
+            return self.templates.setdefault(template.template_id, template).template_id
+
+    def get(self, template_id):
+        return self.templates[template_id]
+
+class StoredPrompt:
+    """
+    A prompt kept as its template ID plus the variable fields; the full text is rebuilt on demand.
+    """
+    __slots__ = ("template_id", "values")
+
+    def __init__(self, template_id, values):
+        self.template_id = template_id
+        self.values = values
+
+    @property
+    def text(self):
+        return TemplateRegistry.instance().get(self.template_id).render(self.values)
+
+    def __str__(self):
+        return self.text
+
+    def to_dict(self):
+        return {"template_id": self.template_id, "fields": self.values}
+
+def expand_prompt(turn, templates):
+    """
+    Replaces a stored {"template_id", "fields"} prompt in a turn dict with its full text, in place.
+    templates: template ID -> PromptTemplate.to_dict() (as written next to the turns).
+    Prompts of records written before templates existed are plain strings and left alone.
+    """
+    prompt = turn.get("prompt")
+    if isinstance(prompt, dict) and prompt.get("template_id") in templates:
+        turn["prompt"] = PromptTemplate.from_dict(templates[prompt["template_id"]]).render(prompt["fields"])
+    return turn
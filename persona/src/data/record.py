@@ -1,16 +1,53 @@
+import uuid
+from collections import deque
 from .record_keeper import RecordKeeper
+from .prompt_template import TemplateRegistry
+
+# Turns kept in memory per record while a RecordSink streams them to disk.
+record_window = 1000
+
+REWARD_FIELDS = ("reward_mental_change", "notes_reward", "response_reward", "response_emotion_reward")
 
 class Record:
     def __init__(self, persona_name):
         self.persona_name = persona_name
-        self.records = []
+        self.record_id = uuid.uuid4().hex
+        self.sink = RecordKeeper.instance().sink
+        # Without a sink this list is the only copy of the turns, so it is not bounded.
+        self.records = deque(maxlen=record_window) if self.sink is not None else []
+        # Running (sum, count) per reward field, so the means cover every turn, not just the window.
+        self.reward_sums = {field: [0.0, 0] for field in REWARD_FIELDS}
         RecordKeeper.instance().register(self)
 
     def record(self, turn):
         self.records.append(turn)
+        for field, sums in self.reward_sums.items():
+            value = getattr(turn, field)
+            if value is not None:
+                sums[0] += float(value)
+                sums[1] += 1
+        if self.sink is not None:
+            self.sink.write_turn(self, turn)
+
+    def mean_rewards(self):
+        """
+        Mean of every reward field over all recorded turns (None for a field no turn has).
+        """
+        return {field: total / count if count else None for field, (total, count) in self.reward_sums.items()}
+
+    def close(self):
+        """
+        Marks the record (episode) as finished in the sink.
+        """
+        if self.sink is not None:
+            self.sink.end_record(self)
 
     def to_dict(self):
+        # Each prompt template used by the turns is stored once, next to them.
+        template_ids = {turn.prompt.template_id for turn in self.records if hasattr(turn.prompt, "template_id")}
+        registry = TemplateRegistry.instance()
         return {
             "persona_name": self.persona_name,
+            "templates": {template_id: registry.get(template_id).to_dict() for template_id in template_ids},
             "records": [turn.to_dict() for turn in self.records]
         }
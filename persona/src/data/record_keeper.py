@@ -1,9 +1,15 @@
+from collections import deque
+
+# Finished epochs kept in memory (for the UIs) while a RecordSink streams the turns to disk.
+epoch_window = 10
+
 class RecordKeeper:
     _instance = None
 
     def __init__(self):
         self.records = []
         self.epochs = []
+        self.sink = None
 
     @classmethod
     def instance(cls):
@@ -11,12 +17,45 @@ class RecordKeeper:
             cls._instance = cls()
         return cls._instance
 
+    def attach_sink(self, sink):
+        """
+        Streams every turn recorded from now on to sink, and bounds what stays in memory.
+        """
+        self.sink = sink
+        self.epochs = deque(self.epochs, maxlen=epoch_window)
+
+    def close_sink(self):
+        if self.sink is not None:
+            self.sink.close()
+            self.sink = None
+
     def register(self, record):
         self.records.append(record)
 
+    def unregister(self, record):
+        if record in self.records:
+            self.records.remove(record)
+
     def get_all_records(self):
         return self.records
 
-    def save_epoch(self):
-        self.epochs.append(self.records.copy())
-        self.records.clear()
+    def load_columnar(self, directory):
+        """
+        Adds a columnar run (see columnar.py) as one epoch of lazy, Record-like views and returns them.
+        """
+        from .columnar import ColumnarRun
+        records = ColumnarRun(directory).records()
+        self.epochs.append(records)
+        return records
+
+    def save_epoch(self, records=None):
+        """
+        Moves records (default: every registered record) into a new epoch.
+        """
+        if records is None:
+            records = self.records.copy()
+        else:
+            records = list(records)
+        self.epochs.append(records)
+        for record in records:
+            self.unregister(record)
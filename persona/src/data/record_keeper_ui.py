@@ -251,6 +251,11 @@ class RecordKeeperUI:
                         panel.figure.savefig(file_path)
                         print(f"[INFO] Saved plot: {file_path}")
 
+            if record.sink is not None:
+                # The turns are already in the turn log; a JSON dump under saved/ would be ingested twice.
+                print(f"[INFO] Turns of {persona_name} are in the turn log at {record.sink.directory}")
+                continue
+
             json_file_path = os.path.join(persona_folder_path, f"{persona_name}.json")
             with open(json_file_path, "w", encoding="utf-8") as json_file:
                 json.dump(record.to_dict(), json_file, indent=4, ensure_ascii=False)
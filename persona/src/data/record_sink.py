@@ -0,0 +1,129 @@
+import os
+import re
+import json
+import time
+import threading
+from .prompt_template import TemplateRegistry, expand_prompt
+
+# A segment is closed and a new one started once it grows past this size.
+segment_max_bytes = 64 * 1024 * 1024
+
+# Lines are flushed to the OS on every write; fsync runs after this many lines or seconds.
+fsync_every = 64
+fsync_seconds = 5.0
+
+SEGMENT_PATTERN = re.compile(r"^segment-(\d+)\.jsonl$")
+
+class RecordSink:
+    """
+    Append-only turn log. Every recorded turn becomes one JSON line
+        {"record_id": ..., "persona_name": ..., "turn": Turn.to_dict()}
+    and a finished record (episode) is closed by {"record_id": ..., "persona_name": ..., "end": true}.
+    Prompt templates are written once per segment as {"template_id": ..., "template": ...}, ahead of
+    the first turn that references them.
+    Lines go to segment-<n>.jsonl files in directory, rotated by size, so a crash loses at most the
+    lines written since the last fsync.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        existing = [int(m.group(1)) for m in map(SEGMENT_PATTERN.match, os.listdir(directory)) if m]
+        # Never append to a segment of an earlier run; its last line may be truncated.
+        self.segment_index = max(existing) + 1 if existing else 0
+        self.file = None
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+        self.written_templates = set()
+        self._open_segment()
+
+    def write_turn(self, record, turn):
+        entry = {"record_id": record.record_id, "persona_name": record.persona_name, "turn": turn.to_dict()}
+        self._write(entry, template_id=getattr(turn.prompt, "template_id", None))
+
+    def end_record(self, record):
+        self._write({"record_id": record.record_id, "persona_name": record.persona_name, "end": True}, sync=True)
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self._sync()
+                self.file.close()
+                self.file = None
+
+    def _write(self, entry, sync=False, template_id=None):
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self.lock:
+            if self.file is None:
+                raise ValueError("RecordSink is closed.")
+            if template_id is not None and template_id not in self.written_templates:
+                template = TemplateRegistry.instance().get(template_id).to_dict()
+                self.file.write(json.dumps({"template_id": template_id, "template": template}, ensure_ascii=False) + "\n")
+                self.written_templates.add(template_id)
+            self.file.write(line)
+            self.file.flush()
+            self.unsynced += 1
+            if sync or self.unsynced >= fsync_every or time.monotonic() - self.last_sync >= fsync_seconds:
+                self._sync()
+            if self.file.tell() >= segment_max_bytes:
+                self.file.close()
+                self.segment_index += 1
+                self._open_segment()
+
+    def _sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def _open_segment(self):
+        path = os.path.join(self.directory, f"segment-{self.segment_index:05d}.jsonl")
+        self.file = open(path, "a", encoding="utf-8")
+        # Each segment carries the templates it uses, so it can be read on its own.
+        self.written_templates = set()
+
+def iter_segment_entries(paths):
+    """
+    Yields the parsed lines of the given segment files in order. A truncated line (from a crash
+    mid-write) is skipped.
+    """
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    print(f"[WARNING] RecordSink: Skipping truncated line in {path}")
+
+def iter_logged_turns(paths, persona_name=None, with_record_id=False):
+    """
+    Streams (persona_name, turn_dict, is_last_turn_of_record) from segment files, in the same form as
+    the saved Record JSON reader, or (record_id, persona_name, turn_dict, is_last) if with_record_id is set.
+    A record whose end marker is missing (crashed run) ends at its last turn.
+    Prompts stored as template + fields are expanded back to their full text.
+    """
+    def item(record_id, name, turn, is_last):
+        return (record_id, name, turn, is_last) if with_record_id else (name, turn, is_last)
+
+    pending = {}  # record_id -> (persona_name, turn) held back until we know whether it is the last one
+    templates = {}  # template_id -> template dict, as read from the segments
+    for entry in iter_segment_entries(paths):
+        if "template" in entry:
+            templates[entry["template_id"]] = entry["template"]
+            continue
+        name = entry.get("persona_name")
+        if persona_name is not None and name != persona_name:
+            continue
+        if not entry.get("end") and "turn" not in entry:
+            continue  # not a turn-log line
+        record_id = entry.get("record_id")
+        previous = pending.pop(record_id, None)
+        if entry.get("end"):
+            if previous is not None:
+                yield item(record_id, previous[0], previous[1], True)
+            continue
+        if previous is not None:
+            yield item(record_id, previous[0], previous[1], False)
+        pending[record_id] = (name, expand_prompt(entry["turn"], templates))
+    for record_id, (name, turn) in pending.items():
+        yield item(record_id, name, turn, True)
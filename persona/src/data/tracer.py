@@ -0,0 +1,206 @@
+import os
+import sys
+import json
+import time
+import threading
+from collections import deque
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Set trace=1 in .env (or call Tracer.instance().enable()) to record spans.
+default_enabled = os.getenv("trace", "0").lower() in ("1", "true", "yes")
+
+# Most recent spans kept for the Chrome trace and the percentiles; older ones are dropped so long runs
+# stay bounded. Counts, totals and maxima in the summary still cover every span.
+max_events = 100000
+
+def percentile(sorted_values, q):
+    """
+    Nearest-rank percentile of an already sorted, non-empty list.
+    """
+    index = max(0, min(len(sorted_values) - 1, int(round(q / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+class _NullSpan:
+    """
+    Returned by Tracer.span while tracing is off, so instrumented code pays one attribute check.
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **args):
+        pass
+
+_null_span = _NullSpan()
+
+class Span:
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.tracer._stack().append(self)
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end_ns = time.perf_counter_ns()
+        self.tracer._stack().pop()
+        memory = self.tracer._device_memory()
+        if memory is not None:
+            self.args["device_memory_mb"] = memory
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer._record(self.name, self.start_ns, end_ns - self.start_ns, self.args)
+        return False
+
+    def set(self, **args):
+        """
+        Adds numeric counters to the span (summed if set more than once), e.g. token counts.
+        """
+        for key, value in args.items():
+            if value is not None:
+                self.args[key] = self.args.get(key, 0) + value
+
+class Tracer:
+    """
+    Collects wall-time spans of the turn pipeline (per thread, nested) and exports them as a
+    Chrome trace (chrome://tracing, Perfetto) or a per-stage summary table.
+    """
+    _instance = None
+
+    def __init__(self, enabled=default_enabled):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.events = deque(maxlen=max_events)  # (name, thread_id, start_ns, duration_ns, args)
+        self.totals = {}    # name -> {"count", "total_ns", "max_ns", <summed token counters>} over every span
+        self.recorded = 0
+        self.origin_ns = time.perf_counter_ns()
+        self.local = threading.local()
+
+    @classmethod
+    def instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def clear(self):
+        with self.lock:
+            self.events = deque(maxlen=max_events)
+            self.totals = {}
+            self.recorded = 0
+        self.origin_ns = time.perf_counter_ns()
+
+    def span(self, name, **args):
+        if not self.enabled:
+            return _null_span
+        return Span(self, name, args)
+
+    def annotate(self, **args):
+        """
+        Adds counters to the innermost open span of the calling thread (no-op if there is none).
+        """
+        if not self.enabled:
+            return
+        stack = self._stack()
+        if stack:
+            stack[-1].set(**args)
+
+    def export_chrome_trace(self, path):
+        with self.lock:
+            events = list(self.events)
+        trace_events = [{
+            "name": name,
+            "cat": name.split(".")[0],
+            "ph": "X",
+            "ts": (start_ns - self.origin_ns) / 1000,
+            "dur": duration_ns / 1000,
+            "pid": os.getpid(),
+            "tid": thread_id,
+            "args": args
+        } for name, thread_id, start_ns, duration_ns, args in events]
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id in {event[1] for event in events}:
+            trace_events.append({"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": thread_id,
+                                 "args": {"name": thread_names.get(thread_id, str(thread_id))}})
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, f)
+        print(f"[INFO] Tracer: Wrote {len(events)} spans to {path}")
+        if self.recorded > len(events):
+            print(f"[INFO] Tracer: {self.recorded - len(events)} earlier spans were dropped (max_events={max_events}).")
+
+    def summary(self):
+        """
+        Returns {stage: {count, total_ms, mean_ms, p50_ms, p95_ms, max_ms, <summed counters>}}.
+        Percentiles are over the retained spans, everything else over every span recorded.
+        """
+        with self.lock:
+            events = list(self.events)
+            totals = {name: dict(values) for name, values in self.totals.items()}
+        durations = {}
+        for name, _, _, duration_ns, _ in events:
+            durations.setdefault(name, []).append(duration_ns / 1e6)
+
+        stats = {}
+        for name, values in totals.items():
+            count = values.pop("count")
+            total_ms = values.pop("total_ns") / 1e6
+            max_ms = values.pop("max_ns") / 1e6
+            retained = sorted(durations.get(name, [])) or [total_ms / count]
+            stats[name] = {
+                "count": count,
+                "total_ms": total_ms,
+                "mean_ms": total_ms / count,
+                "p50_ms": percentile(retained, 50),
+                "p95_ms": percentile(retained, 95),
+                "max_ms": max_ms,
+                **values
+            }
+        return stats
+
+    def format_summary(self):
+        stats = self.summary()
+        header = f"{'stage':<28}{'count':>8}{'total ms':>12}{'mean':>10}{'p50':>10}{'p95':>10}{'max':>10}{'prompt tok':>12}{'gen tok':>10}"
+        lines = [header, "-" * len(header)]
+        for name, s in sorted(stats.items(), key=lambda item: -item[1]["total_ms"]):
+            lines.append(
+                f"{name:<28}{s['count']:>8}{s['total_ms']:>12.1f}{s['mean_ms']:>10.1f}{s['p50_ms']:>10.1f}"
+                f"{s['p95_ms']:>10.1f}{s['max_ms']:>10.1f}{s.get('prompt_tokens', 0):>12}{s.get('generated_tokens', 0):>10}"
+            )
+        return "\n".join(lines)
+
+    def _stack(self):
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    def _record(self, name, start_ns, duration_ns, args):
+        with self.lock:
+            self.events.append((name, threading.get_ident(), start_ns, duration_ns, args))
+            self.recorded += 1
+            totals = self.totals.setdefault(name, {"count": 0, "total_ns": 0, "max_ns": 0})
+            totals["count"] += 1
+            totals["total_ns"] += duration_ns
+            totals["max_ns"] = max(totals["max_ns"], duration_ns)
+            for key, value in args.items():
+                if key.endswith("_tokens"):
+                    totals[key] = totals.get(key, 0) + value
+
+    def _device_memory(self):
+        # Only reports CUDA memory if torch is already loaded; the tracer never imports it.
+        torch = sys.modules.get("torch")
+        if torch is None or not torch.cuda.is_available():
+            return None
+        return round(torch.cuda.memory_allocated() / 2**20, 1)
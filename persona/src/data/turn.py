@@ -1,4 +1,5 @@
 import numpy as np
+from collections.abc import Mapping
 
 class Turn:
     def __init__(self, 
@@ -15,7 +16,7 @@ class Turn:
                  response_reward, 
                  response_emotion,
                  response_emotion_reward,
-                 policy):
+                 policy_version):
         self.input_message = input_message
         self.input_message_embedding = input_message_embeddings
         self.input_message_emotion = input_message_emotions
@@ -24,12 +25,14 @@ class Turn:
         self.reward_mental_change = reward_mental_change
         self.notes = notes
         self.notes_reward = notes_reward
+        # A StoredPrompt (template ID + variable fields); str() rebuilds the full text.
         self.prompt = prompt
         self.response = response
         self.response_reward = response_reward
         self.response_emotion = response_emotion
         self.response_emotion_reward = response_emotion_reward
-        self.policy = policy
+        # Snapshot ID (see PolicySnapshotStore) of the policy weights that chose mental_change.
+        self.policy_version = policy_version
 
     def __str__(self):
         return (
@@ -47,7 +50,7 @@ class Turn:
             f"  response_reward: {self.response_reward}\n"
             f"  response_emotion: {self.response_emotion}\n"
             f"  response_emotion_reward: {self.response_emotion_reward}\n"
-            f"  policy: {self.policy}\n"
+            f"  policy_version: {self.policy_version}\n"
             f")"
         )
     
@@ -61,17 +64,17 @@ class Turn:
             "reward_mental_change": self.reward_mental_change,
             "notes": self.notes,
             "notes_reward": self.notes_reward,
-            "prompt": self.prompt,
+            "prompt": self.prompt.to_dict() if hasattr(self.prompt, "to_dict") else self.prompt,
             "response": self.response,
             "response_reward": self.response_reward,
             "response_emotion": self._convert_numpy(self.response_emotion),
             "response_emotion_reward": self.response_emotion_reward,
-            "policy": self.policy.to_dict()
+            "policy_version": self.policy_version
         }
 
     def _convert_numpy(self, data):
         if isinstance(data, np.ndarray):
             return data.tolist()
-        elif isinstance(data, dict):
+        elif isinstance(data, Mapping):
             return {k: self._convert_numpy(v) for k, v in data.items()} 
         return data 
\ No newline at end of file
@@ -1,4 +1,5 @@
 from .chat import Chat
+from ..data.tracer import Tracer
 
 class Game:
     def __init__(self):
@@ -14,8 +15,9 @@ class Game:
         print(f"[DEBUG] Game: {player['player'].name}'s turn now.")
 
         name = player['player'].name
-        message = player['player'].generate_message(
-                               self.chat.history)
+        with Tracer.instance().span("game.turn", player=name):
+            message = player['player'].generate_message(
+                                   self.chat.history)
 
         self.chat.add_turn(name, 
                            message)
@@ -38,4 +40,8 @@ class Game:
         while turn_counter < num_turns:
             self.play_turn()
             turn_counter += 1
+
+        # Let background reward workers finish so the game's records are complete.
+        for player in self.players:
+            player['player'].finish()
         
\ No newline at end of file
@@ -0,0 +1,67 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from ..ai.model_registry import ModelRegistry
+from ..ai.mental_state import EmotionVector
+
+# Number of distinct messages whose perception results are kept.
+max_entries = 4096
+
+class PerceptionStore:
+    """
+    Process-wide cache of per-message perception results (emotion scores and sentence embeddings),
+    keyed by a hash of the message text, so each message is classified once no matter how many
+    personas read it.
+    """
+    _instance = None
+
+    def __init__(self):
+        self.entries = OrderedDict()  # digest -> {"emotions": EmotionVector, "embedding": ndarray}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def digest(self, text):
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def emotions(self, text):
+        return self._get(text, "emotions", self._classify)
+
+    def embedding(self, text):
+        return self._get(text, "embedding", self._encode)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def _get(self, text, field, compute):
+        key = self.digest(text)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and field in entry:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[field]
+            self.misses += 1
+
+        # Run the model outside the store lock; a concurrent duplicate computation is harmless.
+        value = compute(text)
+        with self.lock:
+            self.entries.setdefault(key, {})[field] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > max_entries:
+                self.entries.popitem(last=False)
+        return value
+
+    def _classify(self, text):
+        results = ModelRegistry.instance().emotion_classifier()(text)
+        return EmotionVector.from_dict({d['label']: d['score'] for d in results[0]})
+
+    def _encode(self, text):
+        return ModelRegistry.instance().sentence_transformer().encode(text)
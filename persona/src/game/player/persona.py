@@ -1,16 +1,22 @@
 from .validator import Validator
+from .reward_worker import RewardWorker
 from ...data.record import Record
 from ...data.turn import Turn
 from ...ai.llm import LLM
 from ...ai.rl import RL
-from transformers import pipeline
-from sentence_transformers import SentenceTransformer
+from ...ai.embedding_state import EmbeddingState
+from ...ai.mental_state import MentalState, EmotionVector
+from ...data.tracer import Tracer
+from ...data.prompt_template import PromptTemplate, TemplateRegistry, StoredPrompt
+from ..perception import PerceptionStore
 from concurrent.futures import ThreadPoolExecutor
-import torch
 import json
 
+# Maximum number of finished turns waiting for rewards before generate_response blocks.
+reward_queue_size = 2
+
 class Persona():
-    def __init__(self, persona_path, training=True):
+    def __init__(self, persona_path, training=True, async_rewards=True):
         try:
             with open(persona_path, "r") as f:
                 data = json.load(f)
@@ -23,23 +29,30 @@ class Persona():
         self.name = data.get("name", "")
         self.backstory = data.get("backstory", "")
         self.goals = data.get("goals", "")
-        self.mental_state = data.get("mental_state", {})
+        # Validated against the fixed schema so the policy always sees the same field order.
+        self.mental_state = MentalState.from_dict(data.get("mental_state", {}))
+        # Prompts list the fields in the order the persona file declares them.
+        self.mental_state_order = [key.lower() for key in data.get("mental_state", {})]
+        self.initial_mental_state = self.mental_state.copy()
 
         self.training = training
+        self.tracer = Tracer.instance()
         self.record = Record(self.name)
         self.llm = LLM()
         self.validator = Validator(self, self.llm)
         self.rl = RL(self.name)
-        self.emotion_classifier = pipeline(
-            "text-classification",
-            model="j-hartmann/emotion-english-distilroberta-base",
-            tokenizer="j-hartmann/emotion-english-distilroberta-base",
-            top_k=None
-        )
-        self.sentence_transformer = SentenceTransformer('sentence-transformers/all-mpnet-base-v2')
+        # Emotion scores and embeddings are cached per message and shared with every other persona;
+        # the models behind them are loaded once per process by the ModelRegistry.
+        self.perception = PerceptionStore.instance()
+        self.embedding_state = EmbeddingState(self.perception.embedding)
+        self.embedding_state.set_background(self.generate_background())
+        # Background and instructions never change for a persona, so turns only store the variable fields.
+        self.prompt_template_id = TemplateRegistry.instance().intern(self.build_prompt_template())
 
-        if torch.cuda.is_available():
-            self.sentence_transformer.to("cuda")
+        # Rewards and policy updates run off the dialogue's critical path, one turn at a time in order.
+        self.reward_worker = None
+        if training and async_rewards:
+            self.reward_worker = RewardWorker(self.learn_from_turn, reward_queue_size, name=f"RewardWorker-{self.name}")
 
     def generate_instructions(self):
         return (
@@ -62,7 +75,11 @@ class Persona():
 
     def format_mental_state(self):
         formatted_lines = []
-        for key, value in self.mental_state.items():
+        for key in self.mental_state_order:
+            value = self.mental_state[key]
+            # Whole numbers print as the persona file wrote them (e.g. "45%", not "45.0%").
+            if value.is_integer():
+                value = int(value)
             formatted_lines.append(f"{key.capitalize()}: {value}%")
         
         return "\n".join(formatted_lines)
@@ -82,31 +99,40 @@ class Persona():
             f"[Your Goals]\n{self.goals}\n\n"
             )
 
-    def generate_prompt(self, notes, message, history):
-        return (
-            f"{self.generate_background()}\n\n"
-            f"[Your Mental State]\n{self.format_mental_state()}\n\n" 
-            f"[Your Current Thoughts]\n{notes}\n\n"
-            f"[Recent Conversation]\n{message}\n\n"
-            f"[Instructions]\n{self.generate_instructions()}\n\n"
-            "[Your Response]\n"
-        )
-    
-    def extract_embeddings(self, message, history):
-        context_string = (
-            f"{self.generate_background()}\n\n"
-            f"[Entire Conversation History]\n{self.format_history(history[:-1])} \n\n"
-            f"[Recent Conversation]\n{message}"
+    def build_prompt_template(self):
+        return PromptTemplate(
+            [
+                f"{self.generate_background()}\n\n[Your Mental State]\n",
+                "\n\n[Your Current Thoughts]\n",
+                "\n\n[Recent Conversation]\n",
+                f"\n\n[Instructions]\n{self.generate_instructions()}\n\n[Your Response]\n"
+            ],
+            ["mental_state", "notes", "message"]
         )
 
-        return self.sentence_transformer.encode(context_string)
+    def generate_stored_prompt(self, notes, message):
+        return StoredPrompt(self.prompt_template_id, {
+            "mental_state": self.format_mental_state(),
+            "notes": notes,
+            "message": message
+        })
+
+    def generate_prompt(self, notes, message, history):
+        return self.generate_stored_prompt(notes, message).text
+    
+    def extract_embeddings(self, messages, history):
+        # Background is embedded once and every message once; only new messages cost an encode.
+        return self.embedding_state.update(history[:-len(messages)], [msg['message'] for msg in messages])
     
     def extract_emotions(self, message):
-        results = self.emotion_classifier(message)
-        emotion_scores = results[0]
-        emotions = {d['label'].lower(): d['score'] for d in emotion_scores}
-             
-        return emotions
+        # Cached by content, so the other NPCs reuse the scores when this text shows up in their history.
+        return self.perception.emotions(message)
+
+    def aggregate_emotions(self, messages):
+        """
+        Averages the cached per-message emotion scores of the recent messages.
+        """
+        return EmotionVector.mean([self.extract_emotions(msg['message']) for msg in messages])
 
     def generate_notes(self, message, history):
         prompt_string = (
@@ -124,7 +150,7 @@ class Persona():
         )
 
         print("[DEBUG] Persona: Generating notes...")
-        return self.llm.generate_response(prompt_string, 256, 0.2)
+        return self.llm.generate_response(prompt_string, 256, 0.2, prefix=self.generate_background())
 
     def reward_mental_change(self, prev_mental_state, mental_change, history):
         return self.validator.validate_mental_change(prev_mental_state, mental_change, history)
@@ -146,6 +172,20 @@ class Persona():
                        response, 
                        response_emotions,
                        offset = 75):
+        if self.validator.combined:
+            scores = self.validator.validate_all(
+                prev_mental_state,
+                mental_change,
+                notes,
+                response,
+                response_emotions,
+                history
+            )
+            return (scores["mental_change"] - offset,
+                    scores["notes"] - offset,
+                    scores["response"] - offset,
+                    scores["emotions"] - offset)
+
         with ThreadPoolExecutor(max_workers=4) as executor:
             future_mental_change_reward = executor.submit(
                 self.reward_mental_change, 
@@ -203,53 +243,103 @@ class Persona():
         messages = history[-num_opponents:]
         message = "\n".join(f"[{msg['player_name']}]: {msg['message']}" for msg in messages)
 
-        embeddings = self.extract_embeddings(message, history)
-        emotions = self.extract_emotions(message)
+        with self.tracer.span("persona.embedding", persona=self.name):
+            embeddings = self.extract_embeddings(messages, history)
+        with self.tracer.span("persona.emotions", persona=self.name):
+            emotions = self.aggregate_emotions(messages)
 
-        prev_mental_state = self.mental_state
-        mental_change = self.rl.select_action(prev_mental_state, embeddings, emotions)
+        prev_mental_state = self.mental_state.copy()
+        with self.tracer.span("rl.select_action", persona=self.name):
+            mental_change = self.rl.select_action(prev_mental_state, embeddings, emotions)
         self.update_mental_state(mental_change)
 
-        notes = self.generate_notes(message, history)
-        prompt = self.generate_prompt(notes, message, history)
+        with self.tracer.span("persona.notes", persona=self.name):
+            notes = self.generate_notes(message, history)
+        stored_prompt = self.generate_stored_prompt(notes, message)
+        prompt = stored_prompt.text
 
         print("[DEBUG] Persona: Generating response...")
-        response = self.llm.generate_response(prompt, 64).replace("\n", "").replace("\"", "")
+        with self.tracer.span("persona.response", persona=self.name):
+            response = self.llm.generate_response(prompt, 64, prefix=self.generate_background()).replace("\n", "").replace("\"", "")
         response = self._finish_naturally(response)
 
         if self.training: 
-            print("[DEBUG] Persona: Updating policy...")
-            response_emotions = self.extract_emotions(response)
+            turn = Turn(
+                message,
+                embeddings,
+                emotions,
+                prev_mental_state,
+                mental_change,
+                None,
+                notes,
+                None,
+                stored_prompt,
+                response,
+                None,
+                None,
+                None,
+                self.rl.acting_policy)
+            # The chat history keeps growing while the worker grades this turn, so hand it a snapshot.
+            if self.reward_worker is not None:
+                self.reward_worker.submit(turn, list(history))
+            else:
+                self.learn_from_turn(turn, history)
 
-            mental_change_reward, notes_reward, response_reward, response_emotion_reward = self.manage_rewards(
-                history, 
-                prev_mental_state, 
-                mental_change, 
-                notes, 
-                response, 
-                response_emotions)
-            
-            self.rl.update_policy(
-                mental_change_reward, 
-                notes_reward, 
-                response_reward, 
-                response_emotion_reward)
-            
-            self.record.record(
-                Turn(
-                    message,                 
-                    embeddings, 
-                    emotions, 
-                    prev_mental_state,
-                    mental_change, 
-                    mental_change_reward, 
-                    notes,
-                    notes_reward,
-                    prompt, 
-                    response, 
-                    response_reward, 
-                    response_emotions, 
-                    response_emotion_reward,
-                    self.rl.policy_net))
-            
-        return response
\ No newline at end of file
+        return response
+
+    def learn_from_turn(self, turn, history):
+        """
+        Computes the rewards for a finished turn, updates the policy and records the turn.
+        """
+        print("[DEBUG] Persona: Updating policy...")
+        try:
+            with self.tracer.span("persona.response_emotions", persona=self.name):
+                turn.response_emotion = self.extract_emotions(turn.response)
+
+            with self.tracer.span("persona.rewards", persona=self.name):
+                mental_change_reward, notes_reward, response_reward, response_emotion_reward = self.manage_rewards(
+                    history, 
+                    turn.prev_mental_state, 
+                    turn.mental_change, 
+                    turn.notes, 
+                    turn.response, 
+                    turn.response_emotion)
+        except Exception:
+            # This turn's transition would otherwise be paired with the next turn's reward.
+            self.rl.discard_pending()
+            raise
+        turn.reward_mental_change = mental_change_reward
+        turn.notes_reward = notes_reward
+        turn.response_reward = response_reward
+        turn.response_emotion_reward = response_emotion_reward
+
+        self.rl.update_policy(
+            mental_change_reward, 
+            notes_reward, 
+            response_reward, 
+            response_emotion_reward)
+
+        self.record.record(turn)
+
+    def flush_rewards(self):
+        """
+        Waits until every queued turn has been rewarded and learned from, closes the episode
+        in the rollout buffer and checkpoints the policy.
+        """
+        if self.reward_worker is not None:
+            self.reward_worker.join()
+        self.record.close()
+        if self.training:
+            self.rl.end_episode()
+            self.rl.save_policy(force=True)
+
+    def reset(self):
+        """
+        Starts a new episode on this persona: restores the initial mental state, forgets the conversation
+        and binds a fresh Record. The policy, its rollout buffer and the loaded models are kept.
+        Call flush_rewards() first so the previous episode is complete.
+        """
+        self.mental_state = self.initial_mental_state.copy()
+        self.embedding_state.reset()
+        self.validator.last_scores.clear()
+        self.record = Record(self.name)
@@ -0,0 +1,43 @@
+import threading
+from .player_npc import NPC
+
+class PersonaPool:
+    """
+    Keeps NPCs alive across epochs so the persona JSON, Record/Validator/RL setup and the policy
+    checkpoint are loaded once per persona instead of once per game. Released NPCs are reset and
+    handed out again; a persona needed by several concurrent games gets one NPC per game.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.idle = {}      # persona_path -> [NPC, ...] waiting for their next game
+        self.paths = {}     # id(NPC) -> persona_path
+        self.built = 0
+
+    def acquire(self, persona_path):
+        with self.lock:
+            idle = self.idle.get(persona_path)
+            npc = idle.pop() if idle else None
+        if npc is not None:
+            npc.reset()
+            return npc
+
+        npc = NPC(persona_path=persona_path)
+        with self.lock:
+            self.paths[id(npc)] = persona_path
+            self.built += 1
+        print(f"[DEBUG] PersonaPool: Built {npc.name} ({self.built} NPCs in pool).")
+        return npc
+
+    def release(self, npc):
+        """
+        Returns an NPC once its game is over (after finish() and after its record has been saved).
+        """
+        with self.lock:
+            persona_path = self.paths.get(id(npc))
+            if persona_path is not None:
+                self.idle.setdefault(persona_path, []).append(npc)
+
+    def release_game(self, game):
+        for player in game.players:
+            if isinstance(player['player'], NPC):
+                self.release(player['player'])
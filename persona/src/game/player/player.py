@@ -4,4 +4,10 @@ class Player:
 
     def generate_message(self, history):
         message = "PLAYER CLASS MESSAGE"
-        return message
\ No newline at end of file
+        return message
+
+    def finish(self):
+        pass
+
+    def reset(self):
+        pass
@@ -7,4 +7,10 @@ class NPC(Player):
         super().__init__(self.persona.name)
 
     def generate_message(self, history):
-        return self.persona.generate_response(history)
\ No newline at end of file
+        return self.persona.generate_response(history)
+
+    def finish(self):
+        self.persona.flush_rewards()
+
+    def reset(self):
+        self.persona.reset()
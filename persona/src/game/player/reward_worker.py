@@ -0,0 +1,32 @@
+import queue
+import threading
+
+class RewardWorker:
+    def __init__(self, handler, max_pending=2, name="RewardWorker"):
+        """
+        handler: Callable run on the worker thread for every submitted job, in submission order.
+        max_pending: Bound on queued jobs; submit blocks once it is reached (backpressure).
+        """
+        self.handler = handler
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._worker = threading.Thread(target=self._loop, name=name, daemon=True)
+        self._worker.start()
+
+    def submit(self, *args):
+        self._queue.put(args)
+
+    def join(self):
+        """
+        Blocks until every submitted job has been handled.
+        """
+        self._queue.join()
+
+    def _loop(self):
+        while True:
+            args = self._queue.get()
+            try:
+                self.handler(*args)
+            except Exception as e:
+                print(f"[ERROR] {self._worker.name}: {e}")
+            finally:
+                self._queue.task_done()
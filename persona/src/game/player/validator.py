@@ -1,40 +1,107 @@
 import re
+import math
 import random
 from src.ai.llm import LLM
+from src.data.tracer import Tracer
+
+# "logits" reads the grade from one forward pass over the digit tokens; "sample" decodes and parses a number.
+default_scoring_mode = "logits"
+
+# Grade all four rubrics from one combined prompt instead of four separate prompts.
+default_combined = True
+
+SCORE_DIGITS = [str(d) for d in range(10)]
+# In the combined answer a grade follows "<label>:", so the digit is scored together with its leading space.
+COMBINED_SCORE_DIGITS = [f" {d}" for d in range(10)]
+
+# Below this total probability on the digit tokens the model is not answering with a grade at all.
+min_digit_mass = 1e-6
+
+# Rubric -> label used for its line in the combined grading output.
+RUBRIC_LABELS = {
+    "mental_change": "Mental Change",
+    "notes": "Notes",
+    "response": "Response",
+    "emotions": "Emotions",
+}
 
 class Validator:
-    def __init__(self, persona, llm: LLM):
+    def __init__(self, persona, llm: LLM, scoring_mode=default_scoring_mode, combined=default_combined):
         self.persona = persona
         self.llm = llm
+        self.scoring_mode = scoring_mode
+        self.combined = combined
+        # Rubric -> (score, confidence) of the most recent grade.
+        self.last_scores = {}
+        self.tracer = Tracer.instance()
 
     def extract_numeric_score(self, response: str, noise_scale: float = 1.0) -> float:
         cleaned = response.strip()
         match = re.search(r'\d+(\.\d{1,2})?', cleaned)
         if not match:
+            print(f"[WARNING] Validator: No score found in '{cleaned}', using neutral score.")
             num = 75.00
-        num = float(match.group())
+        else:
+            num = float(match.group())
         clamped_num = max(0, min(num, 100))
         noise = random.gauss(0, noise_scale)
         noisy_score = clamped_num + noise
         return round(max(0, min(noisy_score, 100)), 2)
-    
+
+    def expected_score(self, probabilities):
+        """
+        Converts next-token probabilities over the digits 0-9 into an expected score on the 0-100 scale
+        and a confidence in [0, 1] (one minus the normalised entropy of the digit distribution).
+        Returns (None, 0.0) if the model put (almost) no probability on the digits.
+        """
+        total = sum(probabilities)
+        if not math.isfinite(total) or total < min_digit_mass:
+            print(f"[WARNING] Validator: Digit probability mass is {total}, no grade.")
+            return None, 0.0
+        probabilities = [p / total for p in probabilities]
+        expected_digit = sum(digit * p for digit, p in enumerate(probabilities))
+        entropy = -sum(p * math.log(p) for p in probabilities if p > 0)
+        confidence = 1 - entropy / math.log(len(probabilities))
+        return round(expected_digit / 9 * 100, 2), round(confidence, 4)
+
     def _validate(self,
                   history, 
                   sections: dict, 
-                  instruction: str) -> int:
+                  rubric: str,
+                  criterion: str) -> float:
         prompt_parts = []
         prompt_parts.append(self.persona.generate_background())
         prompt_parts.append(f"[Conversation So Far]\n{self.persona.format_history(history)}\n\n")
         for header, content in sections.items():
             prompt_parts.append(f"[{header}]\n{content}\n\n")
 
-        base_instructions = " Be harsh but fair with grading. Be very precise down to the hundredth's place. Your response must include only the number, with no additional text, whitespace, or punctuation.\n\n[Answer]\n"
-        instruction = instruction + base_instructions
+        if self.scoring_mode == "logits":
+            scale = "a single digit from 0 to 9"
+            base_instructions = " Be harsh but fair with grading. Your response must include only the digit, with no additional text, whitespace, or punctuation.\n\n[Answer]\n"
+        else:
+            scale = "a single number between 0.00 and 100.00"
+            base_instructions = " Be harsh but fair with grading. Be very precise down to the hundredth's place. Your response must include only the number, with no additional text, whitespace, or punctuation.\n\n[Answer]\n"
+        instruction = f"Based on all of the above information, respond with only {scale} that {criterion}" + base_instructions
         prompt_parts.append(f"[Instructions]\n{instruction}")
         prompt_string = "\n\n".join(prompt_parts)
-        score_response = self.llm.generate_response(prompt_string, 6, 1.4)
-        print(f"score: {score_response}")
-        return self.extract_numeric_score(score_response)
+        # The background and conversation are identical across all four grades of a turn.
+        shared_prefix = "\n\n".join(prompt_parts[:2])
+
+        with self.tracer.span(f"validator.{rubric}", persona=self.persona.name):
+            if self.scoring_mode == "logits":
+                probabilities = self.llm.score_candidates(prompt_string, SCORE_DIGITS, prefix=shared_prefix)
+                score, confidence = self.expected_score(probabilities)
+                if score is None:
+                    # No usable digit distribution: decode the digit instead.
+                    score_response = self.llm.generate_response(prompt_string, 2, 0.2, prefix=shared_prefix)
+                    match = re.search(r'\d', score_response)
+                    score, confidence = (round(int(match.group()) / 9 * 100, 2) if match else 75.00), None
+            else:
+                score_response = self.llm.generate_response(prompt_string, 6, 1.4, prefix=shared_prefix)
+                score, confidence = self.extract_numeric_score(score_response), None
+        print(f"score: {score} (confidence: {confidence})")
+        self.last_scores[rubric] = (score, confidence)
+        return score
     
     def validate_mental_change(self, prev_mental_state, mental_change, history):
         sections = {
@@ -42,42 +109,116 @@ class Validator:
             "Your Mental State Change": self.format_mental_state_change(prev_mental_state, mental_change),
             "Your NEW Mental State": self.format_mental_state(mental_change)
         }
-        instruction = ("Based on all of the above information, respond with only a single number "
-                       "between 0.00 and 100.00 that grades how accurate the mental state change is for your character and how it fits in the conversation.")
+        criterion = "grades how accurate the mental state change is for your character and how it fits in the conversation."
         
         print("[DEBUG] Validator: Validating mental state...")
-        return self._validate(history, sections, instruction)
+        return self._validate(history, sections, "mental_change", criterion)
     
     def validate_notes(self, notes, history):
         sections = {
             "Your notes": notes
         }
-        instruction = ("Based on all of the above information, respond with only a single number "
-                       "between 0.00 and 100.00 that grades how accurate your notes are for your character and how it fits in the conversation.")
+        criterion = "grades how accurate your notes are for your character and how it fits in the conversation."
         
         print("[DEBUG] Validator: Validating notes...")
-        return self._validate(history, sections, instruction)
+        return self._validate(history, sections, "notes", criterion)
     
     def validate_response(self, response, history):
         sections = {
             "Your Response": response
         }
-        instruction = ("Based on all of the above information, respond with only a single number "
-                       "between 0.00 and 100.00 that grades how accurate your response is for your character and how it fits in the conversation.")
+        criterion = "grades how accurate your response is for your character and how it fits in the conversation."
         
         print("[DEBUG] Validator: Validating response...")
-        return self._validate(history, sections, instruction)
+        return self._validate(history, sections, "response", criterion)
     
     def validate_emotions(self, emotions, history):
         sections = {
             "Your Emotions": self.format_emotions(emotions)
         }
-        instruction = ("Based on all of the above information, respond with only a single number "
-                       "between 0.00 and 100.00 that grades how accurate your emotions are for your character and how it fits in the conversation.")
+        criterion = "grades how accurate your emotions are for your character and how it fits in the conversation."
         
         print("[DEBUG] Validator: Validating emotions...")
-        return self._validate(history, sections, instruction)
+        return self._validate(history, sections, "emotions", criterion)
     
+    def validate_all(self, prev_mental_state, mental_change, notes, response, emotions, history):
+        """
+        Grades the mental change, notes, response and emotions from a single combined prompt.
+        Returns a dict keyed by rubric; any rubric that cannot be parsed falls back to its own validator call.
+        """
+        prompt_parts = []
+        prompt_parts.append(self.persona.generate_background())
+        prompt_parts.append(f"[Conversation So Far]\n{self.persona.format_history(history)}\n\n")
+        sections = {
+            "Your PREVIOUS Mental State": self.format_mental_state(prev_mental_state),
+            "Your Mental State Change": self.format_mental_state_change(prev_mental_state, mental_change),
+            "Your NEW Mental State": self.format_mental_state(mental_change),
+            "Your notes": notes,
+            "Your Response": response,
+            "Your Emotions": self.format_emotions(emotions)
+        }
+        for header, content in sections.items():
+            prompt_parts.append(f"[{header}]\n{content}\n\n")
+
+        scale = "a single digit from 0 to 9" if self.scoring_mode == "logits" else "a single number between 0.00 and 100.00"
+        answer_format = "\n".join(f"{label}: <grade>" for label in RUBRIC_LABELS.values())
+        instruction = (
+            "Based on all of the above information, grade each of the following with "
+            f"{scale}: how accurate the mental state change is, how accurate your notes are, "
+            "how accurate your response is, and how accurate your emotions are for your character and how they fit in the conversation. "
+            "Be harsh but fair with grading. Respond with exactly these lines and nothing else:\n"
+            f"{answer_format}\n\n[Answer]\n"
+        )
+        prompt_parts.append(f"[Instructions]\n{instruction}")
+        prompt_string = "\n\n".join(prompt_parts)
+
+        print("[DEBUG] Validator: Validating all rubrics in one call...")
+        with self.tracer.span("validator.combined", persona=self.persona.name):
+            if self.scoring_mode == "logits":
+                scores = self._score_combined_logits(prompt_string)
+            else:
+                scores = self._score_combined_sample(prompt_string)
+
+        fallbacks = {
+            "mental_change": lambda: self.validate_mental_change(prev_mental_state, mental_change, history),
+            "notes": lambda: self.validate_notes(notes, history),
+            "response": lambda: self.validate_response(response, history),
+            "emotions": lambda: self.validate_emotions(emotions, history),
+        }
+        for rubric, fallback in fallbacks.items():
+            if rubric not in scores:
+                print(f"[WARNING] Validator: Could not parse {rubric} grade, validating it separately.")
+                scores[rubric] = fallback()
+        return scores
+
+    def _score_combined_logits(self, prompt_string):
+        # Each grade is read where it would appear in the answer: after the lines already graded (with
+        # their most likely digit). The combined prompt is prefilled once; every grade only adds a few tokens.
+        # A rubric whose digit mass is unusable is left out, so validate_all grades it separately.
+        scores = {}
+        answered = ""
+        for rubric, label in RUBRIC_LABELS.items():
+            probabilities = self.llm.score_candidates(f"{prompt_string}{answered}{label}:", COMBINED_SCORE_DIGITS, prefix=prompt_string)
+            score, confidence = self.expected_score(probabilities)
+            if score is not None:
+                self.last_scores[rubric] = (score, confidence)
+                scores[rubric] = score
+            best_digit = max(range(10), key=lambda d: probabilities[d] if math.isfinite(probabilities[d]) else -1.0)
+            answered += f"{label}: {best_digit}\n"
+        print(f"scores: {scores}")
+        return scores
+
+    def _score_combined_sample(self, prompt_string):
+        score_response = self.llm.generate_response(prompt_string, 48, 1.0, prefix=self.persona.generate_background())
+        print(f"scores: {score_response}")
+        scores = {}
+        for rubric, label in RUBRIC_LABELS.items():
+            match = re.search(rf'^\s*{label}\s*:\s*(\d+(\.\d{{1,2}})?)', score_response, re.IGNORECASE | re.MULTILINE)
+            if match:
+                scores[rubric] = self.extract_numeric_score(match.group(1))
+                self.last_scores[rubric] = (scores[rubric], None)
+        return scores
+
     def format_emotions(self, emotions: dict) -> str:
         output_lines = []
         for emotion, value in emotions.items():
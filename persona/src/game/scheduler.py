@@ -0,0 +1,124 @@
+import queue
+import random
+import threading
+import time
+from ..ai import rl as rl_module
+from ..ai.llm import LLM
+from ..ai.learner import ActorLink, Learner
+from ..data.record_keeper import RecordKeeper
+from ..data.tracer import Tracer
+from .player.player_npc import NPC
+
+class GameScheduler:
+    def __init__(self, num_games=1, base_seed=0, seeds=None, keep_records=True, pool=None):
+        """
+        num_games: Number of games played concurrently (M).
+        base_seed: Game i is seeded with base_seed + i unless seeds is given.
+        seeds: Optional explicit list of per-game seeds.
+        keep_records: Keep finished games' records in RecordKeeper epochs (for the UIs); when False they
+                      are dropped after on_game_end, which is expected to have written them out.
+        pool: Optional PersonaPool the games' NPCs are acquired from; they are released back to it
+              once the game and on_game_end are done.
+        Concurrent games run as threads, so their LLM requests land in the same batching window
+        and share one batched generate call.
+        """
+        self.num_games = num_games
+        self.base_seed = base_seed
+        self.seeds = seeds
+        self.keep_records = keep_records
+        self.pool = pool
+        self.lock = threading.Lock()
+        self.turns_played = 0
+
+    def seed(self, game_index):
+        if self.seeds is not None:
+            return self.seeds[game_index]
+        return self.base_seed + game_index
+
+    def run(self, make_game, num_games_total, num_turns, on_game_end=None):
+        """
+        make_game: Callable (game_index, rng) -> Game with its players added; rng is a random.Random
+                   seeded for that game (use it for persona pairing).
+        num_games_total: Number of games (epochs) to play.
+        on_game_end: Optional callable (game_index, game) run after each game, e.g. to refresh a UI
+                     or write its records.
+        """
+        slots = min(self.num_games, num_games_total)
+        batched_policy_inference = rl_module.batched_policy_inference
+        if slots > 1:
+            # Let the model see the whole wave of concurrent requests, and act for all personas in one pass.
+            llm = LLM()
+            llm.batcher.max_batch_size = max(llm.batcher.max_batch_size, slots * 4)
+            rl_module.batched_policy_inference = True
+
+            # Every concurrent game has its own NPC instances; one learner owns the per-persona policies
+            # so all games train (and checkpoint) the same weights.
+            transition_queue = queue.Queue()
+            weight_queues = [queue.Queue() for _ in range(slots)]
+            learner = threading.Thread(target=Learner(transition_queue, weight_queues).run, name="Learner", daemon=True)
+            learner.start()
+            links = [ActorLink(slot, transition_queue, weight_queues[slot]) for slot in range(slots)]
+        else:
+            learner = None
+            links = [None]
+
+        next_game = iter(range(num_games_total))
+        start = time.monotonic()
+
+        def play_slot(link):
+            try:
+                while True:
+                    with self.lock:
+                        game_index = next(next_game, None)
+                    if game_index is None:
+                        return
+                    self._play(game_index, link, make_game, num_turns, on_game_end)
+            finally:
+                if link is not None:
+                    link.close()
+
+        threads = [threading.Thread(target=play_slot, args=(link,), name=f"GameSlot-{i}") for i, link in enumerate(links)]
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            if learner is not None:
+                learner.join()
+        finally:
+            # Later single-game runs in this process (e.g. the interactive app) act without the executor again.
+            rl_module.batched_policy_inference = batched_policy_inference
+
+        elapsed = time.monotonic() - start
+        print(f"[INFO] GameScheduler: {num_games_total} games, {self.turns_played} turns in {elapsed:.1f}s "
+              f"({self.turns_played / max(elapsed, 1e-9) * 3600:.0f} turns/hour, {slots} concurrent).")
+        if Tracer.instance().enabled:
+            print(Tracer.instance().format_summary())
+
+    def _play(self, game_index, link, make_game, num_turns, on_game_end):
+        seed = self.seed(game_index)
+        print(f"Starting game {game_index+1} (seed {seed})...")
+        game = make_game(game_index, random.Random(seed))
+        if link is not None:
+            for player in game.players:
+                if isinstance(player['player'], NPC):
+                    link.attach(player['player'].persona.rl)
+
+        game_start = time.monotonic()
+        game.play_game(num_turns)
+        elapsed = time.monotonic() - game_start
+
+        records = [player['player'].persona.record for player in game.players if isinstance(player['player'], NPC)]
+        with self.lock:
+            self.turns_played += num_turns
+            if self.keep_records:
+                # Only this game's records: games still running keep theirs for their own epoch.
+                RecordKeeper.instance().save_epoch(records)
+        print(f"Game {game_index+1} complete: {num_turns} turns in {elapsed:.1f}s.\n")
+        if on_game_end is not None:
+            on_game_end(game_index, game)
+        if not self.keep_records:
+            for record in records:
+                RecordKeeper.instance().unregister(record)
+        if self.pool is not None:
+            self.pool.release_game(game)
@@ -0,0 +1,102 @@
+import os
+import json
+
+personas_folder = os.path.join(os.path.dirname(__file__), "..", "game", "player", "personas")
+
+PAIRINGS = ("fixed", "random")
+
+class RunConfig:
+    """
+    Settings of one headless training run, read from a YAML or JSON file:
+
+        personas: [a.json, b.json]  # "fixed": every game uses all of them
+        pairing: fixed              # or "random": anchor plays one persona drawn from pool each game
+        anchor: a.json
+        pool: [b.json, c.json]      # defaults to every other persona file
+        turns: 10
+        epochs: 100
+        parallel_games: 1
+        seed: 0                     # game i uses seed + i, unless seeds lists them explicitly
+        output_dir: runs/example
+        trace: false                # write trace.json (Chrome trace) and trace_summary.txt to output_dir
+        columnar: false             # also convert the turn log to output_dir/columnar (Parquet + .npy) at the end
+    """
+    def __init__(self, personas=None, pairing="fixed", anchor=None, pool=None, turns=10, epochs=1,
+                 parallel_games=1, seed=0, seeds=None, output_dir="runs", trace=False, columnar=False):
+        self.personas = list(personas or [])
+        self.pairing = pairing
+        self.anchor = anchor
+        self.pool = list(pool) if pool is not None else None
+        self.turns = int(turns)
+        self.epochs = int(epochs)
+        self.parallel_games = int(parallel_games)
+        self.seed = int(seed)
+        self.seeds = [int(s) for s in seeds] if seeds is not None else None
+        self.output_dir = output_dir
+        self.trace = bool(trace)
+        self.columnar = bool(columnar)
+        self.validate()
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            if path.endswith((".yaml", ".yml")):
+                import yaml
+                data = yaml.safe_load(f)
+            else:
+                data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError(f"Run config {path} must be a mapping.")
+        unknown = set(data) - set(cls().to_dict())
+        if unknown:
+            raise ValueError(f"Unknown run config keys: {', '.join(sorted(unknown))}")
+        return cls(**data)
+
+    def validate(self):
+        if self.pairing not in PAIRINGS:
+            raise ValueError(f"pairing must be one of {PAIRINGS}, got {self.pairing!r}")
+        if self.turns < 1 or self.epochs < 1 or self.parallel_games < 1:
+            raise ValueError("turns, epochs and parallel_games must be at least 1.")
+        if self.seeds is not None and len(self.seeds) < self.epochs:
+            raise ValueError(f"seeds lists {len(self.seeds)} seeds for {self.epochs} epochs.")
+
+    def persona_path(self, persona_file):
+        return os.path.join(personas_folder, persona_file)
+
+    def resolve(self):
+        """
+        Checks the persona files exist and fills in the random pairing pool. Returns self.
+        """
+        available = sorted(f for f in os.listdir(personas_folder) if f.endswith(".json"))
+        if self.pairing == "fixed":
+            if len(self.personas) < 2:
+                raise ValueError("A fixed pairing needs at least 2 personas.")
+            chosen = self.personas
+        else:
+            if self.anchor is None:
+                raise ValueError("A random pairing needs an anchor persona.")
+            if self.pool is None:
+                self.pool = [f for f in available if f != self.anchor]
+            if not self.pool:
+                raise ValueError("The random pairing pool is empty.")
+            chosen = [self.anchor] + self.pool
+        missing = [f for f in chosen if f not in available]
+        if missing:
+            raise ValueError(f"Persona files not found in {personas_folder}: {', '.join(missing)}")
+        return self
+
+    def to_dict(self):
+        return {
+            "personas": self.personas,
+            "pairing": self.pairing,
+            "anchor": self.anchor,
+            "pool": self.pool,
+            "turns": self.turns,
+            "epochs": self.epochs,
+            "parallel_games": self.parallel_games,
+            "seed": self.seed,
+            "seeds": self.seeds,
+            "output_dir": self.output_dir,
+            "trace": self.trace,
+            "columnar": self.columnar
+        }
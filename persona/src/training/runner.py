@@ -0,0 +1,86 @@
+import os
+import json
+import threading
+from ..game.game import Game
+from ..game.scheduler import GameScheduler
+from ..game.player.player_npc import NPC
+from ..game.player.persona_pool import PersonaPool
+from ..ai.model_registry import ModelRegistry
+from ..data.tracer import Tracer
+from ..data.record_keeper import RecordKeeper
+from ..data.record_sink import RecordSink
+
+class HeadlessRunner:
+    """
+    Plays a RunConfig without any UI, streaming everything to disk as it happens:
+        <output_dir>/config.json                    the resolved run config
+        <output_dir>/turns/segment-<n>.jsonl        every turn as it is recorded (RecordSink), readable by train_offline.py
+        <output_dir>/games.jsonl                    one summary line per finished game
+        <output_dir>/trace.json, trace_summary.txt  per-stage spans, if config.trace is set
+        <output_dir>/columnar/                      Parquet + memory-mappable embeddings, if config.columnar is set
+    Finished games are dropped from memory.
+    """
+    def __init__(self, config):
+        self.config = config.resolve()
+        self.turns_dir = os.path.join(config.output_dir, "turns")
+        self.summary_path = os.path.join(config.output_dir, "games.jsonl")
+        self.lock = threading.Lock()
+        self.pool = PersonaPool()
+        self.scheduler = GameScheduler(num_games=config.parallel_games, base_seed=config.seed,
+                                       seeds=config.seeds, keep_records=False, pool=self.pool)
+
+    def run(self):
+        os.makedirs(self.config.output_dir, exist_ok=True)
+        RecordKeeper.instance().attach_sink(RecordSink(self.turns_dir))
+        self._write_json(os.path.join(self.config.output_dir, "config.json"), self.config.to_dict())
+
+        tracer = Tracer.instance()
+        if self.config.trace:
+            tracer.enable()
+        ModelRegistry.instance().warmup()
+        try:
+            with open(self.summary_path, "a", encoding="utf-8") as self.summary_file:
+                self.scheduler.run(self.make_game, self.config.epochs, self.config.turns, self.on_game_end)
+        finally:
+            RecordKeeper.instance().close_sink()
+            ModelRegistry.instance().release()
+            if tracer.enabled:
+                tracer.export_chrome_trace(os.path.join(self.config.output_dir, "trace.json"))
+                with open(os.path.join(self.config.output_dir, "trace_summary.txt"), "w", encoding="utf-8") as f:
+                    f.write(tracer.format_summary() + "\n")
+        if self.config.columnar:
+            from ..data.columnar import convert_run
+            count = convert_run(self.turns_dir, os.path.join(self.config.output_dir, "columnar"))
+            print(f"[INFO] HeadlessRunner: Wrote {count} turns in columnar form.")
+        print(f"[INFO] HeadlessRunner: Run written to {self.config.output_dir}")
+
+    def make_game(self, epoch, rng):
+        if self.config.pairing == "fixed":
+            persona_files = self.config.personas
+        else:
+            persona_files = [self.config.anchor, rng.choice(self.config.pool)]
+
+        game = Game()
+        for persona_file in persona_files:
+            game.add_player(self.pool.acquire(self.config.persona_path(persona_file)))
+        return game
+
+    def on_game_end(self, epoch, game):
+        summary = {"epoch": epoch + 1, "seed": self.scheduler.seed(epoch), "turns": self.config.turns, "personas": {}}
+        for player in game.players:
+            npc = player['player']
+            if not isinstance(npc, NPC):
+                continue
+            record = npc.persona.record
+            summary["personas"][record.persona_name] = {"record_id": record.record_id, **record.mean_rewards()}
+
+        with self.lock:
+            self.summary_file.write(json.dumps(summary) + "\n")
+            self.summary_file.flush()
+
+    def _write_json(self, path, data):
+        # Write-then-rename so a crashed run never leaves a truncated file behind.
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4, ensure_ascii=False)
+        os.replace(tmp_path, path)
@@ -0,0 +1,86 @@
+import os
+import datetime
+import random
+import argparse
+import multiprocessing as mp
+
+from src.ai.learner import ActorLink, run_learner
+
+personas_folder = os.path.join(os.path.dirname(__file__), "src", "game", "player", "personas")
+
+def run_actor(worker_id, persona_files, num_turns, num_epochs, seed, run_dir, transition_queue, weight_queue):
+    """
+    Game worker: plays num_epochs games with the given personas and ships every rewarded
+    transition to the learner instead of training locally.
+    """
+    # Heavy imports happen in the worker so the learner process never loads the LLM.
+    import torch
+    from src.game.game import Game
+    from src.game.player.persona_pool import PersonaPool
+    from src.data.record_keeper import RecordKeeper
+    from src.data.record_sink import RecordSink
+    from src.ai.model_registry import ModelRegistry
+
+    random.seed(seed)
+    torch.manual_seed(seed)
+    ModelRegistry.instance().warmup()
+    link = ActorLink(worker_id, transition_queue, weight_queue)
+    RecordKeeper.instance().attach_sink(RecordSink(os.path.join(run_dir, f"worker-{worker_id}")))
+    pool = PersonaPool()
+
+    try:
+        for epoch in range(num_epochs):
+            print(f"[DEBUG] Worker {worker_id}: Starting epoch {epoch+1}/{num_epochs}...")
+            game = Game()
+            for persona_file in persona_files:
+                npc = pool.acquire(os.path.join(personas_folder, persona_file))
+                link.attach(npc.persona.rl)
+                game.add_player(npc)
+            game.play_game(num_turns)
+            RecordKeeper.instance().save_epoch()
+            pool.release_game(game)
+    finally:
+        # Always tell the learner, otherwise it would wait for this worker forever.
+        link.close()
+        RecordKeeper.instance().close_sink()
+
+if __name__ == "__main__":
+    persona_files = sorted(f for f in os.listdir(personas_folder) if f.endswith(".json"))
+
+    parser = argparse.ArgumentParser(description="Train with several game worker processes feeding one policy learner.")
+    parser.add_argument("--personas", nargs="+", required=True, choices=persona_files,
+                        help="Persona files to put in every game.")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    parser.add_argument("--turns", type=int, default=10, help="Turns per game.")
+    parser.add_argument("--epochs", type=int, default=1, help="Games per worker.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if len(args.personas) < 2:
+        parser.error("At least 2 personas are needed for a game.")
+
+    date_str = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    run_dir = os.path.join(os.path.dirname(__file__), "src", "data", "saved", f"run - {date_str}")
+
+    # CUDA cannot be re-initialised in forked children.
+    ctx = mp.get_context("spawn")
+    transition_queue = ctx.Queue()
+    weight_queues = [ctx.Queue() for _ in range(args.workers)]
+
+    learner = ctx.Process(target=run_learner, args=(transition_queue, weight_queues), name="Learner")
+    learner.start()
+
+    actors = []
+    for worker_id in range(args.workers):
+        actor = ctx.Process(
+            target=run_actor,
+            args=(worker_id, args.personas, args.turns, args.epochs, args.seed + worker_id, run_dir, transition_queue, weight_queues[worker_id]),
+            name=f"Actor-{worker_id}"
+        )
+        actor.start()
+        actors.append(actor)
+
+    for actor in actors:
+        actor.join()
+    learner.join()
+    print("Training complete. All workers finished.")
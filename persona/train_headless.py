@@ -0,0 +1,21 @@
+import argparse
+
+from src.training.config import RunConfig
+from src.training.runner import HeadlessRunner
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a training config without the Tk UI or interactive prompts.")
+    parser.add_argument("config", help="Run config (.yaml/.yml or .json).")
+    parser.add_argument("--output-dir", help="Overrides output_dir from the config.")
+    args = parser.parse_args()
+
+    try:
+        config = RunConfig.load(args.config)
+        if args.output_dir:
+            config.output_dir = args.output_dir
+        runner = HeadlessRunner(config)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    runner.run()
+    print("Training complete. All epochs finished.")
@@ -0,0 +1,31 @@
+import os
+import argparse
+
+from src.ai.rl import RL
+from src.ai.offline import OfflineTrainer, iter_recorded_turns
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train persona policies from recorded turns without running the LLM.")
+    parser.add_argument("--records", default=os.path.join(os.path.dirname(__file__), "src", "data", "saved"),
+                        help="Saved record file or folder to read (searched recursively).")
+    parser.add_argument("--persona", action="append",
+                        help="Persona name to train (repeatable). Defaults to every persona found in the records.")
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--minibatch-size", type=int, default=256)
+    parser.add_argument("--beta", type=float, default=1.0, help="AWR advantage temperature.")
+    args = parser.parse_args()
+
+    personas = args.persona
+    if not personas:
+        personas = sorted({name for name, _, _ in iter_recorded_turns(args.records) if name})
+    if not personas:
+        print("No recorded turns found in", args.records)
+        exit(1)
+
+    for persona_name in personas:
+        print(f"\n--- Offline training for {persona_name} ---\n")
+        rl = RL(persona_name)
+        trainer = OfflineTrainer(rl, epochs=args.epochs, minibatch_size=args.minibatch_size, beta=args.beta)
+        turns = ((turn, done) for _, turn, done in iter_recorded_turns(args.records, persona_name))
+        if trainer.train(turns) == 0:
+            print(f"No usable turns for {persona_name}.")
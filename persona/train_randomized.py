@@ -1,12 +1,15 @@
 import os
+import datetime
 import signal
 import threading
-import random
 import tkinter as tk
 
 from src.game.game import Game
-from src.game.player.player_npc import NPC
+from src.game.scheduler import GameScheduler
+from src.game.player.persona_pool import PersonaPool
 from src.data.record_keeper import RecordKeeper
+from src.data.record_sink import RecordSink
+from src.ai.model_registry import ModelRegistry
 from src.data.record_keeper_ui import RecordKeeperUI
 from src.data.epoch_keeper_ui import EpochRecordKeeperUI
 
@@ -88,45 +91,59 @@ while True:
     except ValueError as e:
         print("Invalid input:", e)
 
+while True:
+    try:
+        num_parallel = int(input("Enter the number of games to run in parallel: ").strip())
+        if num_parallel < 1:
+            raise ValueError("At least 1 game must run at a time.")
+        break
+    except ValueError as e:
+        print("Invalid input:", e)
+
 # ---------- Define the Training Loop Function ----------
 def training_loop():
     print("\n--- Starting Training ---\n")
+    # Load the shared emotion classifier and sentence encoder once for every epoch and persona.
+    ModelRegistry.instance().warmup()
+
+    # Stream every turn to disk as it is recorded; only a recent window stays in memory.
+    date_str = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    turns_dir = os.path.join(os.path.dirname(__file__), "src", "data", "saved", f"run - {date_str}", "turns")
+    RecordKeeper.instance().attach_sink(RecordSink(turns_dir))
+    print(f"[INFO] Streaming turns to {turns_dir}")
 
-    last_random_persona = None  # Track the last randomly chosen persona to avoid immediate repeats
-    
-    for epoch in range(num_epochs):
-        print(f"Starting epoch {epoch+1}/{num_epochs}...")
+    # NPCs are built once per persona and reset between epochs.
+    pool = PersonaPool()
 
-        # Select a new random persona for this epoch, ensuring it's different from the last one
-        random_persona = last_random_persona
-        while random_persona == last_random_persona:
-            random_persona = random.choice(remaining_personas)
-        last_random_persona = random_persona  # Update last used persona
+    def make_game(epoch, rng):
+        # Each game draws its opponent from its own seeded generator, so a run is reproducible
+        # regardless of how the concurrent games interleave.
+        random_persona = rng.choice(remaining_personas)
 
         print(f"\nEpoch {epoch+1}: Your persona ({chosen_persona}) is interacting with {random_persona}.\n")
 
-        # Create a new game instance for each epoch.
+        # Create a new game instance for each epoch (the NPCs come from the pool).
         game = Game()
 
         # Add the user's chosen persona as the consistent player
-        chosen_npc = NPC(persona_path=os.path.join(personas_folder, chosen_persona))
+        chosen_npc = pool.acquire(os.path.join(personas_folder, chosen_persona))
         game.add_player(chosen_npc)
 
         # Add the randomly selected persona for this game
-        npc = NPC(persona_path=os.path.join(personas_folder, random_persona))
+        npc = pool.acquire(os.path.join(personas_folder, random_persona))
         game.add_player(npc)
+        return game
 
-        # Play the game for the specified number of turns.
-        game.play_game(num_turns)
-
-        # Save the epoch's records and clear them for the next game.
-        RecordKeeper.instance().save_epoch()
-        print(f"\nEpoch {epoch+1} complete.\n")
-
+    def on_game_end(epoch, game):
         # Schedule UI update
         if ui_root is not None:
             ui_root.after(0, lambda epoch_num=epoch+1: create_record_keeper_window(epoch_num))
 
+    # Plays the epochs num_parallel at a time; the scheduler saves each finished game's records.
+    GameScheduler(num_games=num_parallel, pool=pool).run(make_game, num_epochs, num_turns, on_game_end)
+
+    RecordKeeper.instance().close_sink()
+    ModelRegistry.instance().release()
     print("Training complete. All epochs finished.")
 
 # ---------- Start the Training Loop in its own thread ----------